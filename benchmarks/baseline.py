@@ -0,0 +1,67 @@
+"""
+Save benchmark results as a baseline, and compare later runs against it
+
+Shared by every benchmark script, which are run directly, eg.
+
+    python benchmarks/startup.py --output startup.json
+    python benchmarks/startup.py --baseline startup.json
+"""
+import json
+import sys
+
+import click
+
+
+def baseline_options(max_regression, help):
+    """
+    Add the --output, --baseline and --max-regression options to a command
+    """
+    def decorate(func):
+        func = click.option('--max-regression',
+                            default=max_regression,
+                            help=help)(func)
+        func = click.option(
+            '--baseline',
+            type=click.File('r'),
+            help='Compare against previously saved results')(func)
+        return click.option('--output',
+                            type=click.File('w'),
+                            help='Save the results as a baseline')(func)
+
+    return decorate
+
+
+class Baseline:
+    """
+    Previously saved results, and which results have regressed from them
+    """
+    def __init__(self, fh, max_regression):
+        self.previous = json.load(fh) if fh else {}
+        self.max_regression = max_regression
+        self.regressions = []
+
+    def get(self, name):
+        return self.previous.get(name)
+
+    def check(self, name, value):
+        """
+        Record a result as regressed if it grew by more than max_regression
+        percent, returning the baseline's result, if any
+        """
+        previous = self.previous.get(name)
+        if previous is not None and value > previous * (
+                1 + self.max_regression / 100):
+            self.regressions.append(name)
+        return previous
+
+    def finish(self, results, output, message):
+        """
+        Save results, if asked, then exit with 1 if any regressed
+        """
+        if output:
+            json.dump(results, output, indent=4, sort_keys=True)
+        if self.regressions:
+            click.secho(f'{message}: {", ".join(self.regressions)}',
+                        fg='red',
+                        err=True)
+            sys.exit(1)
@@ -0,0 +1,385 @@
+"""
+Benchmark stax's hot paths offline
+
+AWS is replaced by botocore Stubbers, so every benchmark runs without
+credentials or network access, and only measures stax itself.
+
+    python benchmarks/hot_paths.py --output hot_paths.json
+    python benchmarks/hot_paths.py --baseline hot_paths.json
+"""
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import boto3
+import click
+from baseline import Baseline, baseline_options
+from botocore.stub import Stubber
+from click.testing import CliRunner
+
+from stax import utils
+from stax.aws import cloudformation, connection_manager, template_cache
+from stax.aws.regions import DEFAULT_AWS_REGIONS
+from stax.stax import Context, cli
+
+ACCOUNTS = ['dev', 'staging', 'prod', 'shared']
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register a benchmark, which sets up in a directory and returns
+    the function to time
+    """
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+class StubClients:
+    """
+    Hand out Stubber backed clients in place of real ones
+    """
+    def __init__(self):
+        self.clients = {}
+        self.stubbers = {}
+
+    def __call__(self, profile, region, service):
+        key = (profile, region, service)
+        if key not in self.clients:
+            self.clients[key] = boto3.client(service,
+                                             region_name=region,
+                                             aws_access_key_id='stax',
+                                             aws_secret_access_key='stax')
+            self.stubbers[key] = Stubber(self.clients[key])
+            self.stubbers[key].activate()
+        return self.clients[key]
+
+    def stubber(self, profile, region, service):
+        self(profile, region, service)
+        return self.stubbers[(profile, region, service)]
+
+
+def install_stubs():
+    stubs = StubClients()
+    cloudformation.get_client = stubs
+    connection_manager.get_client = stubs
+    return stubs
+
+
+def reset():
+    """
+    Forget everything shared between runs
+    """
+    cloudformation._SNAPSHOTS.clear()
+    cloudformation._TEMPLATES.clear()
+    template_cache._PARSED.clear()
+
+
+def make_context(config):
+    ctx = click.Context(cli, obj=Context(False))
+    ctx.obj._config = config
+    return ctx
+
+
+def make_template(resources):
+    return {
+        'Resources': {
+            f'Topic{i}': {
+                'Type': 'AWS::SNS::Topic',
+                'Properties': {
+                    'TopicName': {
+                        'Fn::Sub': f'${{AWS::StackName}}-{i}'
+                    },
+                    'Tags': [{
+                        'Key': 'index',
+                        'Value': str(i)
+                    }],
+                }
+            }
+            for i in range(resources)
+        }
+    }
+
+
+def make_config(directory, stacks, templates=20):
+    """
+    Write templates, and return a config spreading stacks across accounts
+    """
+    for template in range(templates):
+        with open(os.path.join(directory, f'template{template}.json'),
+                  'w') as fh:
+            json.dump(make_template(50 + template), fh)
+
+    accounts = {
+        account: {
+            'id': str(1000 + i),
+            'profile': account
+        }
+        for i, account in enumerate(ACCOUNTS)
+    }
+    return {
+        'accounts': accounts,
+        'default_region': 'ap-southeast-2',
+        'stacks': {
+            f'stack-{i}': {
+                'template':
+                os.path.join(directory, f'template{i % templates}.json'),
+                'parameters': {account: ''
+                               for account in ACCOUNTS},
+            }
+            for i in range(stacks // len(ACCOUNTS))
+        }
+    }
+
+
+def describe(name, stax_hash='none'):
+    return {
+        'StackName': name,
+        'StackStatus': 'UPDATE_COMPLETE',
+        'CreationTime': '2020-01-01',
+        'Tags': [{
+            'Key': 'STAX_HASH',
+            'Value': stax_hash
+        }],
+    }
+
+
+for stacks in (1000, 10000):
+
+    @benchmark(f'select_one_{stacks // 1000}k')
+    def select_one(directory, stacks=stacks):
+        config = make_config(directory, stacks)
+
+        def run():
+            ctx = make_context(config)
+            utils.set_stacks(ctx)
+            utils.class_filter(ctx.obj.stacks,
+                               account=ACCOUNTS,
+                               region=DEFAULT_AWS_REGIONS,
+                               name=['stack-42'])
+
+        return run
+
+    @benchmark(f'select_account_{stacks // 1000}k')
+    def select_account(directory, stacks=stacks):
+        config = make_config(directory, stacks)
+
+        def run():
+            reset()
+            ctx = make_context(config)
+            utils.set_stacks(ctx)
+            utils.class_filter(ctx.obj.stacks,
+                               account=['prod'],
+                               region=DEFAULT_AWS_REGIONS,
+                               name=())
+
+        return run
+
+
+for extn, dump in (('json', json.dumps), ('yaml', None)):
+
+    @benchmark(f'to_dict_{extn}')
+    def to_dict(directory, extn=extn, dump=dump):
+        body = make_template(2000)
+        if dump:
+            body = dump(body, indent=4)
+        else:
+            import yaml
+            body = yaml.safe_dump(body)
+
+        def run():
+            reset()
+            cloudformation.Template(template_body=body).to_dict
+
+        return run
+
+
+def make_yaml_template(resources):
+    """
+    Return a YAML template using short form intrinsic functions
+    """
+    lines = ['AWSTemplateFormatVersion: 2010-09-09', 'Resources:']
+    for i in range(resources):
+        lines += [
+            f'  Topic{i}:',
+            '    Type: AWS::SNS::Topic',
+            '    Properties:',
+            f'      TopicName: !Sub ${{AWS::StackName}}-{i}',
+            '      KmsMasterKeyId: !ImportValue shared-key',
+            f'      DisplayName: !Join [-, [!Ref AWS::Region, {i}]]',
+            '      Tags:',
+            '        - Key: index',
+            f'          Value: {i}',
+        ]
+    return '\n'.join(lines)
+
+
+for loader in ('base', 'cfn'):
+
+    @benchmark(f'parse_yaml_{loader}')
+    def parse_yaml(directory, loader=loader):
+        """
+        Parse YAML with the BaseLoader stax used to, or the current loader
+        """
+        import yaml
+
+        body = make_yaml_template(2000)
+        if loader == 'base':
+            return lambda: yaml.load(body, Loader=yaml.BaseLoader)
+        return lambda: template_cache.parse_raw(body)
+
+
+@benchmark('plan_1k')
+def plan(directory):
+    """
+    Compare the STAX_HASH of 1k local stacks with a described account
+    """
+    stacks = install_stubs()
+    config = make_config(directory, 4000)
+    ctx = make_context(config)
+    with ctx:
+        utils.set_stacks(ctx)
+        _, found = utils.class_filter(ctx.obj.stacks,
+                                      account=['prod'],
+                                      region=['ap-southeast-2'])
+        # Half the stacks have changed
+        described = [
+            describe(stack.name,
+                     stack.hash_of_params_and_template if i % 2 else 'changed')
+            for i, stack in enumerate(found)
+        ]
+
+    def run():
+        reset()
+        stubber = stacks.stubber('prod', 'ap-southeast-2', 'cloudformation')
+        stubber.add_response('describe_stacks', {'Stacks': described})
+        with ctx:
+            utils.set_stacks(ctx)
+            _, found = utils.class_filter(ctx.obj.stacks,
+                                          account=['prod'],
+                                          region=['ap-southeast-2'])
+            [
+                stack for stack in found
+                if stack.pending_update(stack.remote_stax_hash)
+            ]
+
+    return run
+
+
+@benchmark('describe_5k')
+def describe_pages(directory):
+    """
+    Describe 5k stacks, 100 per page
+    """
+    stacks = install_stubs()
+    ctx = make_context({'accounts': {'dev': {'id': '1', 'profile': 'dev'}}})
+    pages = [[describe(f'stack-{page}-{i}') for i in range(100)]
+             for page in range(50)]
+
+    def run():
+        stubber = stacks.stubber('dev', 'ap-southeast-2', 'cloudformation')
+        for page, described in enumerate(pages):
+            response = {'Stacks': described}
+            if page + 1 < len(pages):
+                response['NextToken'] = str(page + 1)
+            stubber.add_response('describe_stacks', response)
+        with ctx:
+            cloudformation.Cloudformation('dev',
+                                          'ap-southeast-2').describe_stacks()
+
+    return run
+
+
+@benchmark('pull_all_regions')
+def pull(directory):
+    """
+    Pull 20 stacks from every region of an account
+    """
+    stacks = install_stubs()
+    config = {
+        'accounts': {
+            'dev': {
+                'id': '1',
+                'profile': 'dev'
+            }
+        },
+        'default_region': 'ap-southeast-2',
+        'stacks': {},
+    }
+    with open(os.path.join(directory, 'stax.json'), 'w') as fh:
+        json.dump(config, fh)
+    body = json.dumps(make_template(50))
+
+    def run():
+        reset()
+        for region in DEFAULT_AWS_REGIONS:
+            stubber = stacks.stubber('dev', region, 'cloudformation')
+            stubber.add_response('describe_stacks', {
+                'Stacks': [describe(f'{region}-stack-{i}') for i in range(20)]
+            })
+            for _ in range(20):
+                # botocore parses the body of each response in place
+                stubber.add_response('get_template', {'TemplateBody': body})
+        result = CliRunner().invoke(cli, ['pull', '--force'])
+        if result.exit_code:
+            raise click.ClickException(result.output)
+
+    return run
+
+
+def measure(name, repeat):
+    """
+    Return the median milliseconds taken by a benchmark
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            run = BENCHMARKS[name](directory)
+            # Warm up imports and on-disk caches first
+            run()
+            times = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                run()
+                times.append((time.perf_counter() - started) * 1000)
+        finally:
+            os.chdir(cwd)
+    return statistics.median(times)
+
+
+@click.command()
+@click.option('--repeat', default=5, help='Runs per benchmark')
+@baseline_options(25.0,
+                  'Fail if any benchmark slows by more than this percent')
+@click.argument('names', nargs=-1)
+def hot_paths(repeat, output, baseline, max_regression, names):
+    """
+    Benchmark stax's hot paths, or just those named
+    """
+    # Keep caches out of the real cache directory, and off disk
+    os.environ['STAX_CACHE_DIR'] = tempfile.mkdtemp()
+    os.environ.pop('STAX_TEMPLATE_CACHE_MB', None)
+
+    previous = Baseline(baseline, max_regression)
+    results = {}
+
+    click.echo(f'{"benchmark":<20}{"ms":>10}{"baseline":>10}')
+    for name in names or BENCHMARKS:
+        results[name] = measure(name, repeat)
+        line = f'{name:<20}{results[name]:>10.1f}'
+        before = previous.check(name, results[name])
+        if before is not None:
+            line += f'{before:>10.1f}'
+        click.echo(line)
+
+    previous.finish(results, output, 'Slower')
+
+
+if __name__ == '__main__':
+    hot_paths()
@@ -0,0 +1,113 @@
+"""
+Measure how much memory stax holds for a large stax.json
+
+A stax.json with many stacks sharing a handful of template files is
+generated in a temporary directory, every stack is loaded, hashed and
+has its template parsed just as push does, and the memory still held
+afterwards is reported.
+
+    python benchmarks/memory.py --output memory.json
+    python benchmarks/memory.py --baseline memory.json
+"""
+import json
+import os
+import tempfile
+import tracemalloc
+
+import click
+from baseline import Baseline, baseline_options
+
+from stax.registry import StackRegistry
+
+ACCOUNTS = ['dev', 'staging', 'prod', 'shared']
+
+
+def make_config(directory, stacks, templates, template_size):
+    """
+    Write templates, and return a config using them for stacks stacks
+    """
+    resource = {'Type': 'AWS::SNS::Topic', 'Properties': {'TopicName': 'x'}}
+    resources_per_template = max(template_size // 80, 1)
+    for template in range(templates):
+        body = {
+            'Resources': {
+                f'Topic{template}x{i}': resource
+                for i in range(resources_per_template)
+            }
+        }
+        with open(os.path.join(directory, f'template{template}.json'),
+                  'w') as fh:
+            json.dump(body, fh)
+
+    names = stacks // len(ACCOUNTS)
+    return {
+        'default_region': 'ap-southeast-2',
+        'stacks': {
+            f'stack-{i}': {
+                'template':
+                os.path.join(directory, f'template{i % templates}.json'),
+                'parameters': {account: ''
+                               for account in ACCOUNTS},
+            }
+            for i in range(names)
+        }
+    }
+
+
+def measure(config):
+    """
+    Return the bytes held, and the peak bytes used, after loading
+    and hashing every stack
+    """
+    tracemalloc.start()
+    registry = StackRegistry(config)
+    stacks = list(registry)
+    for stack in stacks:
+        stack.hash_of_params_and_template
+        # Just as a push orders, then creates a changeset for, each stack
+        stack.template.to_dict
+        stack.template.release()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak
+
+
+@click.command()
+@click.option('--stacks', default=10000, help='Stacks in stax.json')
+@click.option('--templates', default=50, help='Template files they share')
+@click.option('--template-size',
+              default=20000,
+              help='Approximate bytes per template')
+@baseline_options(10.0, 'Fail if memory grows by more than this percent')
+def memory(stacks, templates, template_size, output, baseline, max_regression):
+    """
+    Benchmark memory held per stack
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        # Keep fingerprints out of the real cache
+        os.environ['STAX_CACHE_DIR'] = os.path.join(directory, 'cache')
+        config = make_config(directory, stacks, templates, template_size)
+        current, peak = measure(config)
+
+    results = {
+        'current': current,
+        'peak': peak,
+        'per_stack': current / stacks,
+    }
+    previous = Baseline(baseline, max_regression)
+
+    click.echo(f'{"":<12}{"bytes":>14}{"baseline":>14}')
+    for name, value in results.items():
+        line = f'{name:<12}{value:>14,.0f}'
+        # Only the memory held counts as a regression
+        before = previous.check(
+            name, value) if name == 'current' else (previous.get(name))
+        if before is not None:
+            line += f'{before:>14,.0f}'
+        click.echo(line)
+
+    previous.finish(results, output, 'More memory held than the baseline')
+
+
+if __name__ == '__main__':
+    memory()
@@ -0,0 +1,79 @@
+"""
+Measure how long each stax subcommand takes to start
+
+Every subcommand is started with `python -X importtime`, running just
+far enough to print its --help, and the time spent importing modules
+is reported along with the slowest top level imports.
+
+    python benchmarks/startup.py --output startup.json
+    python benchmarks/startup.py --baseline startup.json
+"""
+import subprocess
+import sys
+
+import click
+from baseline import Baseline, baseline_options
+
+from stax.stax import cli
+
+
+def import_times(args):
+    """
+    Return the cumulative microseconds spent on each top level import
+    """
+    code = f'from stax.stax import cli; cli({args!r})'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True,
+                          text=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented, and already counted by their parent
+        if not name.startswith('  '):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure(command, repeat):
+    """
+    Return the median startup import time in milliseconds,
+    and the slowest imports of the median run
+    """
+    args = [command, '--help'] if command else ['--version']
+    runs = sorted((sum(times.values()), times)
+                  for times in (import_times(args) for _ in range(repeat)))
+    total, times = runs[len(runs) // 2]
+    slowest = sorted(times, key=times.get, reverse=True)[:3]
+    return total / 1000, [(name, times[name] / 1000) for name in slowest]
+
+
+@click.command()
+@click.option('--repeat', default=5, help='Runs per subcommand')
+@baseline_options(25.0,
+                  'Fail if any subcommand slows by more than this percent')
+def startup(repeat, output, baseline, max_regression):
+    """
+    Benchmark stax startup time per subcommand
+    """
+    commands = [None] + cli.list_commands(None)
+    previous = Baseline(baseline, max_regression)
+    results = {}
+
+    click.echo(f'{"command":<14}{"ms":>9}{"baseline":>10}  slowest imports')
+    for command in commands:
+        name = command or '--version'
+        results[name], slowest = measure(command, repeat)
+        line = f'{name:<14}{results[name]:>9.1f}'
+        before = previous.check(name, results[name])
+        line += ' ' * 10 if before is None else f'{before:>10.1f}'
+        line += '  ' + ', '.join(f'{module} {ms:.1f}'
+                                 for module, ms in slowest)
+        click.echo(line)
+
+    previous.finish(results, output, 'Slower startup')
+
+
+if __name__ == '__main__':
+    startup()
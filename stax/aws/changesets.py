@@ -0,0 +1,46 @@
+"""
+Read the changes within a changeset
+"""
+import collections
+
+# A resource change, where causes maps each changed scope of the
+# resource (eg. Properties or Tags) to the entities causing it to change
+Change = collections.namedtuple('Change', [
+    'action', 'logical_id', 'physical_id', 'resource_type', 'replacement',
+    'causes'
+])
+
+
+def parse_change(change):
+    """
+    Return a Change from a changeset's raw change
+    """
+    rc = change['ResourceChange']
+    causes = {scope: [] for scope in rc.get('Scope', [])}
+    for detail in rc.get('Details', []):
+        scope = detail.get('Target', {}).get('Attribute')
+        if 'CausingEntity' in detail:
+            causes.setdefault(scope, []).append(detail['CausingEntity'])
+    return Change(action=rc['Action'],
+                  logical_id=rc['LogicalResourceId'],
+                  physical_id=rc.get('PhysicalResourceId'),
+                  resource_type=rc['ResourceType'],
+                  replacement=rc.get('Replacement') in ['True', True],
+                  causes=causes)
+
+
+def iter_changes(client, changeset):
+    """
+    Yield a Change for everything within a described changeset,
+    fetching any further pages of changes only as they are needed
+    """
+    response = changeset
+    while True:
+        for change in response.get('Changes', []):
+            if 'ResourceChange' in change:
+                yield parse_change(change)
+        if not response.get('NextToken'):
+            return
+        response = client.describe_change_set(
+            ChangeSetName=changeset['ChangeSetId'],
+            NextToken=response['NextToken'])
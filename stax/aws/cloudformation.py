@@ -1,4 +1,5 @@
 import collections
+import concurrent.futures
 import datetime
 import difflib
 import hashlib
@@ -8,20 +9,22 @@ import os
 import pathlib
 import string
 import sys
+import threading
 import time
 import uuid
 
-import boto3
-import botocore
+import botocore.exceptions
 import click
-import halo
-import yaml
 
-from .. import gitlib
-from ..exceptions import StackNotFound
+from .. import files, gitlib, parallel, profiling
+from ..exceptions import ChangesetError, StackNotFound
+from ..fingerprint import FINGERPRINTS
+from . import template_cache, uploads
+from .changesets import iter_changes
 from .connection_manager import get_client
-
-yaml.add_multi_constructor('!', lambda loader, suffix, node: None)
+from .events import EventTail, format_event
+from .poller import POLLER
+from .regions import DEFAULT_AWS_REGIONS
 
 SUCCESS_STATES = [
     'CREATE_COMPLETE',
@@ -41,24 +44,29 @@ FAILURE_STATES = [
     'UPDATE_ROLLBACK_FAILED',
 ]
 
-DEFAULT_AWS_REGIONS = [
-    'ap-northeast-1',
-    'ap-northeast-2',
-    'ap-south-1',
-    'ap-southeast-1',
-    'ap-southeast-2',
-    'ca-central-1',
-    'eu-central-1',
-    'eu-north-1',
-    'eu-west-1',
-    'eu-west-2',
-    'eu-west-3',
-    'sa-east-1',
-    'us-east-1',
-    'us-east-2',
-    'us-west-1',
-    'us-west-2',
-]
+# How often, in seconds, a waiting stack fetches its new events
+EVENTS_INTERVAL = 5
+
+# Only one stack may prompt the user at a time
+_CONFIRM_LOCK = threading.Lock()
+
+# Described stacks, fetched once per (account, region) and indexed by name
+_SNAPSHOTS = {}
+_SNAPSHOT_LOCKS = collections.defaultdict(threading.Lock)
+
+# Templates read from files, shared by every stack using the same file
+_TEMPLATES = {}
+_TEMPLATES_LOCK = threading.Lock()
+
+
+def spinner(**kwargs):
+    """
+    Return a halo spinner, which is disabled inside worker threads
+    as concurrent spinners would draw over each other
+    """
+    import halo
+
+    return halo.Halo(enabled=not parallel.in_worker(), **kwargs)
 
 
 def get_diff(s1, s2, prefix):
@@ -89,34 +97,86 @@ def print_diff(diff):
     return changes
 
 
+def intern(value):
+    """
+    Share identical strings, eg. template bodies pulled from many regions
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
 class Template:
+    __slots__ = ('body', 'file', 'extn', 'parsed', 'users')
+
     def __init__(self, template_body=None, template_file=None):
-        self.body = template_body
+        self.body = intern(template_body)
         self.file = template_file
         self.extn = 'json'
+        self.parsed = None
+        # How many stacks share this template and haven't released it
+        self.users = 0
 
         if self.body and self.file:
             raise ValueError('You must specify one of either body or file')
 
+    @classmethod
+    def from_file(cls, template_file):
+        """
+        Return the Template for a file, shared by every stack using it
+        """
+        with _TEMPLATES_LOCK:
+            template = _TEMPLATES.get(template_file)
+            if template is None:
+                template = _TEMPLATES[template_file] = cls(
+                    template_file=template_file)
+            template.users += 1
+        return template
+
     @property
     def raw(self):
-        if not self.body:
+        # Templates are shared between threads, which may release the body
+        body = self.body
+        if not body:
             with open(self.file) as fh:
-                self.body = fh.read()
-        return self.body
+                body = self.body = intern(fh.read())
+        return body
+
+    def release(self):
+        """
+        Give up a stack's use of a file backed template, dropping its body
+        and parsed contents once no stack still needs them, to be read
+        again if needed
+        """
+        if not self.file:
+            return
+        with _TEMPLATES_LOCK:
+            self.users = max(self.users - 1, 0)
+            if self.users == 0:
+                if self.body and self.parsed is not None:
+                    template_cache.forget(self.body)
+                self.body = None
+                self.parsed = None
 
     @property
     def to_dict(self):
-        if isinstance(self.raw, str):
-            try:
-                return json.loads(self.raw)
-            except:
-                self.extn = 'yaml'
-                return yaml.load(self.raw, Loader=yaml.BaseLoader)
-        return self.raw
+        """
+        Return the parsed template, which is shared and must not be modified
+        """
+        raw = self.raw
+        if isinstance(raw, str):
+            # Another thread may release the template while it is parsed
+            parsed = self.parsed
+            if parsed is None:
+                self.extn, parsed = template_cache.parse(raw)
+                self.parsed = parsed
+            return parsed
+        return raw
 
 
 class Params:
+    __slots__ = ('params', 'type')
+
     def __init__(self, params):
         """
         Assemble a Params class by either passing in a:
@@ -124,7 +184,7 @@ class Params:
           dict   - To read a dict of {k: v} values
           list   - To read a list of {ParameterName: foo, ParameterValue: bar} dicts
         """
-        self.params = params
+        self.params = intern(params)
 
         if self.params is None or self.params == '':
             self.type = 'dict'
@@ -168,6 +228,8 @@ class Params:
 
 
 class Tags:
+    __slots__ = ('tags', 'type')
+
     def __init__(self, tags):
         """
         Assemble a Params class by either passing in a:
@@ -206,6 +268,8 @@ class Cloudformation:
     """
     Class for actions to do with Cloudformation
     """
+    __slots__ = ('account', 'region')
+
     def __init__(self, account=None, region=None):
         self.account = account
         self.region = region
@@ -224,24 +288,22 @@ class Cloudformation:
         """
         return get_client(self.bucket['profile'], self.bucket['region'], 's3')
 
+    @property
+    def client_keys(self):
+        """
+        Return the (profile, region, client) of every client this may use
+        """
+        keys = [(self.profile, self.region, 'cloudformation')]
+        if getattr(self, 'bucket', None):
+            keys.append((self.bucket['profile'], self.bucket['region'], 's3'))
+        return keys
+
     def gen_stack(self, stack_json):
         if stack_json['StackName'].startswith('StackSet'):
             raise ValueError(f'Ignoring StackSet {stack_json["StackName"]}')
 
-        attempt = 0
-        while True:
-            try:
-                raw_template = self.client.get_template(
-                    StackName=stack_json['StackName'])['TemplateBody']
-                break
-            except botocore.exceptions.ClientError as err:
-                if err.response['Error']['Message'].find('Throttling') != -1:
-                    if attempt > 10:
-                        raise
-                    time.sleep(2 ^ attempt * 100)
-                    attempt += 1
-                else:
-                    raise
+        raw_template = self.client.get_template(
+            StackName=stack_json['StackName'])['TemplateBody']
 
         stack = Stack(
             name=stack_json['StackName'],
@@ -262,10 +324,11 @@ class Cloudformation:
 
         return stack
 
-    def save_stack(self, stack, force):
-        with open('stax.json', 'r') as fh_read:
-            stack_json = json.load(fh_read)
-
+    def save_stack(self, stack, stack_json):
+        """
+        Save a stack's template and parameters, and record it in
+        stack_json, the in-memory stax.json
+        """
         try:
             template_dest = string.Template(
                 stack_json['stacks'][stack.name]['template']).substitute(
@@ -288,14 +351,14 @@ class Cloudformation:
             pathlib.Path(f'{stack.account}/{stack.name}').mkdir(parents=True,
                                                                 exist_ok=True)
 
-        with open(template_dest, 'w') as fh:
-            if stack.template.extn == 'yaml':
-                # We can dump raw YAML - https://github.com/boto/boto3/issues/1468
-                fh.write(stack.template.raw)
-            else:
-                # If the JSON template can be parsed, it's returned as a dict
-                # so we can't return the original file, so we may as well pretty it
-                json.dump(stack.template.to_dict, fh, indent=4)
+        if stack.template.extn == 'yaml':
+            # We can dump raw YAML - https://github.com/boto/boto3/issues/1468
+            files.write_if_changed(template_dest, stack.template.raw)
+        else:
+            # If the JSON template can be parsed, it's returned as a dict
+            # so we can't return the original file, so we may as well pretty it
+            files.write_if_changed(
+                template_dest, json.dumps(stack.template.to_dict, indent=4))
 
         if stack.name not in stack_json['stacks']:
             stack_json['stacks'][stack.name] = {}
@@ -304,8 +367,8 @@ class Cloudformation:
 
         has_params = stack.params.to_dict
         if has_params:
-            with open(params_dest, 'w') as fh:
-                json.dump(has_params, fh, sort_keys=True, indent=4)
+            files.write_if_changed(
+                params_dest, json.dumps(has_params, sort_keys=True, indent=4))
             stack_json['stacks'][stack.name]['parameters'][
                 stack.account] = params_val
         else:
@@ -316,29 +379,43 @@ class Cloudformation:
         if self.region not in stack_json['stacks'][stack.name]['regions']:
             stack_json['stacks'][stack.name]['regions'].append(self.region)
 
-        with open('stax.json', 'w') as fh_write:
-            json.dump(stack_json, fh_write, sort_keys=True, indent=4)
+    def remote_stacks(self, stack_names=None):
+        """
+        Return the descriptions of the live stacks to pull, in describe order
+        """
+        return [
+            remote_stack for name, remote_stack in self.snapshot.items()
+            if not stack_names or name in stack_names
+        ]
 
-    def generate_stacks(self, local_stacks={}, stack_names=None, force=False):
+    def fetch_stack(self, remote_stack):
         """
-        Pull down a list of created AWS stacks, and
-        generate the configuration locally
+        Download the template of a live stack, returning the parsed stack,
+        or the reason it was skipped
         """
-        for _, remote_stack in self.describe_stacks(stack_names).items():
-            if remote_stack['StackStatus'] in ['REVIEW_IN_PROGRESS']:
-                print(
-                    f'Skipping {remote_stack["StackName"]} due to {remote_stack["StackStatus"]} status'
-                )
-                continue
-            try:
-                parsed_stack = self.gen_stack(remote_stack)
-            except ValueError as err:
-                print(err)
+        if remote_stack['StackStatus'] in ['REVIEW_IN_PROGRESS']:
+            return None, f'Skipping {remote_stack["StackName"]} due to {remote_stack["StackStatus"]} status'
+        try:
+            return self.gen_stack(remote_stack), None
+        except ValueError as err:
+            return None, err
+
+    def save_stacks(self, fetched, stack_json, local_stacks={}, force=False):
+        """
+        Save the Results of fetch_stack locally, one at a time and in
+        order, recording them in stack_json, the in-memory stax.json
+        """
+        for result in fetched:
+            if result.error:
+                raise result.error
+            parsed_stack, skipped = result.value
+            if skipped:
+                print(skipped)
                 continue
 
             if force or parsed_stack not in local_stacks:
                 click.echo(f'Saving stack {parsed_stack.name}')
-                self.save_stack(parsed_stack, force)
+                self.save_stack(parsed_stack, stack_json)
             else:
                 click.echo(
                     f'Skipping stack {parsed_stack.name} as it exists in stax.json - The live stack may differ, use --force to force'
@@ -352,17 +429,13 @@ class Cloudformation:
         list_of_stacks_to_describe = [{
             'StackName': name
         } for name in names] if names else [{}]
+        paginator = self.client.get_paginator('describe_stacks')
         for stack_to_describe in list_of_stacks_to_describe:
-            paginator = self.client.get_paginator('describe_stacks')
             response_iterator = paginator.paginate(**stack_to_describe)
             try:
-                results = {
-                    **results,
-                    **{
-                        stack['StackName']: stack
-                        for name in names for response in response_iterator for stack in response['Stacks']
-                    }
-                }
+                for response in response_iterator:
+                    for stack in response['Stacks']:
+                        results[stack['StackName']] = stack
             except botocore.exceptions.ClientError as err:
                 if err.response['Error']['Message'].find(
                         'does not exist') != -1:
@@ -372,16 +445,105 @@ class Cloudformation:
                 raise
         return results
 
+    @property
+    def snapshot(self):
+        """
+        Return every live stack in this account and region, indexed by name
+
+        Stacks are described in bulk the first time this is requested,
+        then shared by every Cloudformation instance for the rest of the run
+        """
+        key = (self.account, self.region)
+        with _SNAPSHOT_LOCKS[key]:
+            if key not in _SNAPSHOTS:
+                _SNAPSHOTS[key] = self.describe_stacks()
+        return _SNAPSHOTS[key]
+
+    def refresh_snapshot(self, description=None):
+        """
+        Record a newer description of this stack, or its absence
+        """
+        snapshot = _SNAPSHOTS.get((self.account, self.region))
+        if snapshot is None:
+            return
+        if description:
+            snapshot[self.name] = description
+        else:
+            snapshot.pop(self.name, None)
+
+    @property
+    def remote(self):
+        """
+        Return the live description of this stack, if it exists
+        """
+        return self.snapshot.get(self.name)
+
+    def detect_drift(self):
+        """
+        Start detecting drift, returning a future resolving to the final
+        detection status, or None if the stack doesn't exist
+        """
+        try:
+            detection_id = self.client.detect_stack_drift(
+                StackName=self.name)['StackDriftDetectionId']
+        except botocore.exceptions.ClientError as err:
+            if err.response['Error']['Message'].find('does not exist') == -1:
+                raise
+            return None
+        return POLLER.watch_drift(self, detection_id)
+
+    def drifted_resources(self):
+        """
+        Yield the stack's modified and deleted resources from its last
+        drift detection, fetching pages only as they are needed
+        """
+        kwargs = {
+            'StackName': self.name,
+            'StackResourceDriftStatusFilters': ['MODIFIED', 'DELETED'],
+        }
+        while True:
+            response = self.client.describe_stack_resource_drifts(**kwargs)
+            yield from response['StackResourceDrifts']
+            if not response.get('NextToken'):
+                return
+            kwargs['NextToken'] = response['NextToken']
+
+    def fetch_remote_template(self):
+        """
+        Fetch the live template of this stack, or None if it doesn't exist
+        """
+        try:
+            body = self.client.get_template(
+                StackName=self.name, TemplateStage='Original')['TemplateBody']
+        except botocore.exceptions.ClientError as err:
+            if err.response['Error']['Message'].find('does not exist') == -1:
+                raise
+            return None
+        return Template(template_body=body)
+
+    @property
+    def remote_tags(self):
+        """
+        Return the live tags of this stack as a dict
+        """
+        return {
+            tag['Key']: tag['Value']
+            for tag in (self.remote or {}).get('Tags', [])
+        }
+
+    @property
+    def remote_stax_hash(self):
+        """
+        Return the STAX_HASH tag of the live stack, if any
+        """
+        return self.remote_tags.get('STAX_HASH')
+
     @property
     def exists(self):
         """
         Determine if an individual stack exists
         """
-        try:
-            if self.describe_stacks(names=[self.name]):
-                return True
-        except StackNotFound:
-            return False
+        return self.remote is not None
 
     @property
     def context(self):
@@ -432,51 +594,89 @@ class Cloudformation:
         req = self.client.describe_stack_resources(StackName=self.name)
         return req['StackResources']
 
-    def wait_for_stack_update(self, action=None):
+    @profiling.timed('wait', method=True)
+    def wait_for_stack_update(self, action=None, events=None):
         """
-        Wait for a stack change/update
+        Wait for a stack change/update, printing each new stack event
+        from an EventTail as it happens
         """
         kwargs = {'text': '{self.name}: {action} Pending'}
         if action == 'deletion':
             kwargs['color'] = 'red'
-        spinner = halo.Halo(**kwargs)
-        spinner.start()
-
-        while True:
-            try:
-                req = self.client.describe_stacks(StackName=self.name)
-            except botocore.exceptions.ClientError as err:
-                if err.response['Error']['Message'].find(
-                        'does not exist') != -1:
-                    if action == 'deletion':
-                        return spinner.succeed(
-                            f'{self.name}: DELETE_COMPLETE (or stack not found)'
-                        )
-                    raise StackNotFound(f'{self.name} stack no longer exists')
-                raise
+        status_spinner = spinner(**kwargs)
+        status_spinner.start()
 
-            status = req['Stacks'][0]['StackStatus']
+        def on_update(status):
+            status_spinner.text = f'{self.name}: {status}'
 
-            spinner.text = f'{self.name}: {status}'
-            if status in FAILURE_STATES:
-                return spinner.fail()
-            elif status in SUCCESS_STATES:
-                return spinner.succeed()
-
-            time.sleep(1)
+        def show_events():
+            if events is None:
+                return
+            try:
+                new_events = events.poll()
+            except (botocore.exceptions.BotoCoreError,
+                    botocore.exceptions.ClientError) as err:
+                # Missing events shouldn't stop us waiting on the stack
+                new_events = []
+                click.echo(f'{self.name}: unable to fetch events: {err}',
+                           err=True)
+            if new_events:
+                status_spinner.stop()
+                for event in new_events:
+                    click.echo(format_event(event))
+                status_spinner.start()
+
+        future = POLLER.watch_stack(self,
+                                    until=SUCCESS_STATES + FAILURE_STATES,
+                                    deleting=action == 'deletion',
+                                    on_update=on_update)
+        # Events are fetched from this thread rather than the poller's,
+        # so they never hold up polling for other stacks
+        timeout = EVENTS_INTERVAL if events is not None else None
+        try:
+            while True:
+                try:
+                    description = future.result(timeout=timeout)
+                    break
+                except concurrent.futures.TimeoutError:
+                    show_events()
+        except StackNotFound:
+            self.refresh_snapshot()
+            raise
+        finally:
+            show_events()
+
+        if description is None:
+            self.refresh_snapshot()
+            status_spinner.succeed(
+                f'{self.name}: DELETE_COMPLETE (or stack not found)')
+            return 'DELETE_COMPLETE'
+
+        status = description['StackStatus']
+        self.refresh_snapshot(
+            description if status != 'DELETE_COMPLETE' else None)
+
+        if status in FAILURE_STATES:
+            status_spinner.fail()
+        else:
+            status_spinner.succeed()
+        return status
 
+    @profiling.timed('create changeset', method=True)
     def changeset_create_and_wait(self,
                                   set_type,
                                   use_existing_params=False,
                                   skip_tags=False):
         """
         Request a changeset, and wait for creation
+
+        Returns the described changeset, or None if there are no changes
         """
-        spinner = halo.Halo(
+        changeset_spinner = spinner(
             text=
             f'Creating {set_type.lower()} changeset for {self.name}/{self.account} in {self.region}'
         )
-        spinner.start()
+        changeset_spinner.start()
         # Create Changeset
         kwargs = dict(
             ChangeSetName=f'stax-{uuid.uuid4()}',
@@ -484,19 +684,16 @@ class Cloudformation:
             Capabilities=["CAPABILITY_IAM", "CAPABILITY_NAMED_IAM"],
         )
 
-        if len(self.template.raw) <= 51200:
-            kwargs['TemplateBody'] = self.template.raw
+        if self.needs_upload:
+            kwargs['TemplateURL'] = self.upload_template()
         else:
-            kwargs[
-                'TemplateURL'] = f'https://{self.bucket["name"]}.s3.{self.bucket["region"]}.amazonaws.com/stax/stax_template_{self.hash_of_template}'
-            self.bucket_client.put_object(
-                Body=self.template.raw,
-                Bucket=self.bucket['name'],
-                Key=f'stax/stax_template_{self.hash_of_template}')
+            kwargs['TemplateBody'] = self.template.raw
         if use_existing_params:
-            stack_describe = self.describe_stacks(name=self.name)[self.name]
+            stack_describe = self.remote or {}
             if 'Parameters' in stack_describe:
-                kwargs['Parameters'] = stack_describe['Parameters'].copy()
+                kwargs['Parameters'] = [
+                    param.copy() for param in stack_describe['Parameters']
+                ]
                 for param in kwargs['Parameters']:
                     param['UsePreviousValue'] = True
                     del (param['ParameterValue'])
@@ -518,47 +715,72 @@ class Cloudformation:
             cs_id = req['Id']
         except botocore.exceptions.ClientError as err:
             err_msg = err.response['Error']['Message']
-            spinner.fail(f'{self.name}: {err.response["Error"]["Message"]}')
+            changeset_spinner.fail(
+                f'{self.name}: {err.response["Error"]["Message"]}')
             if err_msg.find('does not exist') != -1:
                 #spinner.fail(f'{self.name} does not exist')
                 raise StackNotFound(f'{self.name} stack no longer exists')
-            sys.exit(1)
+            raise ChangesetError(f'{self.name}: {err_msg}')
+
+        # The template has been hashed and sent, so drop its body
+        self.template.release()
 
         # Wait for it to be ready
-        while True:
-            req = self.client.describe_change_set(ChangeSetName=cs_id)
-            if req['Status'] not in ['CREATE_PENDING', 'CREATE_IN_PROGRESS']:
-                break
-            time.sleep(1)
+        req = POLLER.watch_changeset(self, cs_id).result()
         if 'StatusReason' in req and req['StatusReason'].find(
                 "didn't contain changes") != -1:
-            spinner.succeed(
+            changeset_spinner.succeed(
                 f'{self.name}/{self.account} in {self.region} is up to date!\n'
             )
             return
-        spinner.succeed()
-
-        investigate = parse_changeset_changes(req['Changes'])
-
-        for thing in investigate:
-            if thing == 'Tags':
-                old_tags = self.describe_stacks(
-                    name=self.name)[self.name]['Tags']
-                new_tags = kwargs['Tags']
-                differences = [
-                    click.echo(f'{k}: \n' +
-                               click.style(f'  - {old_tags[k]}\n', fg=red) +
-                               click.style(f'  + {v}'))
-                    for k, v in new_tags.items() if old_tags.get(k) != v
-                ]
+        changeset_spinner.succeed()
 
-                f'Are you sure you want to {click.style("create", fg="green")} {self.account}/{self.name} in {self.region}?'
+        return req
+
+    def confirm_changeset(self, changeset, question):
+        """
+        Show the changes within a changeset and ask to apply them,
+        deleting the changeset if declined
+        """
+        # Fetch every page of changes before waiting for the prompt
+        changes = list(iter_changes(self.client, changeset))
 
-        return cs_id
+        with _CONFIRM_LOCK:
+            if parallel.in_worker():
+                click.secho(f'\n{self.name}/{self.account} in {self.region}:',
+                            bold=True)
+
+            investigate = parse_changeset_changes(changes)
+
+            for thing in investigate:
+                if thing == 'Tags':
+                    old_tags = self.remote_tags
+                    new_tags = {
+                        tag['Key']: tag['Value']
+                        for tag in changeset.get('Tags', [])
+                    }
+                    for k, v in new_tags.items():
+                        if old_tags.get(k) != v:
+                            old = click.style(f'  - {old_tags.get(k)}',
+                                              fg='red')
+                            new = click.style(f'  + {v}', fg='green')
+                            click.echo(f'{k}: \n{old}\n{new}')
+
+            with profiling.span('confirm', 'human'):
+                confirmed = click.confirm(question)
+            if confirmed:
+                return True
+
+        self.client.delete_change_set(ChangeSetName=changeset['ChangeSetId'],
+                                      StackName=self.name)
+        self.context.debug(f'Deleted changeset {changeset["ChangeSetId"]}')
+        return False
 
     def create(self):
         """
         Create a stack via change set
+
+        Returns the final stack status, or None if nothing was executed
         """
         # Create changeset
         changeset = self.changeset_create_and_wait('CREATE')
@@ -566,35 +788,55 @@ class Cloudformation:
         if not changeset:
             return
 
-        if not click.confirm(
+        if not self.confirm_changeset(
+                changeset,
                 f'Are you sure you want to {click.style("create", fg="green")} {self.account}/{self.name} in {self.region}?'
         ):
-            self.client.delete_change_set(ChangeSetName=changeset,
-                                          StackName=self.name)
-            self.context.debug(f'Deleted changeset {changeset}')
             return
 
-        # Execute changeset
-        req = self.client.execute_change_set(ChangeSetName=changeset)
-
-        # Wait for changes
-        self.wait_for_stack_update()
+        return self.execute_changeset(changeset['ChangeSetId'])
 
     def delete(self):
         """
         Create a stack via change set
+
+        Returns the final stack status, or None if nothing was executed
         """
-        if not click.confirm(
-                f'Are you sure you want to {click.style("delete", fg="red")} {self.account}/{self.name} in {self.region}?'
-        ):
+        question = f'Are you sure you want to {click.style("delete", fg="red")} {self.account}/{self.name} in {self.region}?'
+        with _CONFIRM_LOCK, profiling.span('confirm', 'human'):
+            confirmed = click.confirm(question)
+        if not confirmed:
             return
+        return self.delete_and_wait()
+
+    def execute_changeset(self, changeset_id):
+        """
+        Execute a changeset, following only the events it causes
+
+        Returns the final stack status
+        """
+        events = EventTail(self.client, self.name)
+        events.prime()
+        self.client.execute_change_set(ChangeSetName=changeset_id)
+        return self.wait_for_stack_update(events=events)
+
+    def delete_and_wait(self):
+        """
+        Delete a stack without asking first
+
+        Returns the final stack status
+        """
         click.echo(f'Deleting {self.name} in {self.region}')
-        req = self.client.delete_stack(StackName=self.name)
-        self.wait_for_stack_update('deletion')
+        events = EventTail(self.client, self.name)
+        events.prime()
+        self.client.delete_stack(StackName=self.name)
+        return self.wait_for_stack_update('deletion', events=events)
 
     def update(self, use_existing_params, skip_tags):
         """
         Update a stack via change set
+
+        Returns the final stack status, or None if nothing was executed
         """
         # Create changeset
         changeset = self.changeset_create_and_wait(
@@ -605,19 +847,13 @@ class Cloudformation:
         if not changeset:
             return
 
-        if not click.confirm(
+        if not self.confirm_changeset(
+                changeset,
                 f'Are you sure you want to {click.style("update", fg="cyan")} {click.style(self.account, bold=True)}/{self.name} in {self.region}?'
         ):
-            self.client.delete_change_set(ChangeSetName=changeset,
-                                          StackName=self.name)
-            self.context.debug(f'Deleted changeset {changeset}')
             return
 
-        # Execute changeset
-        req = self.client.execute_change_set(ChangeSetName=changeset)
-
-        # Wait for changes
-        self.wait_for_stack_update()
+        return self.execute_changeset(changeset['ChangeSetId'])
 
 
 class Stack(Cloudformation):
@@ -625,17 +861,21 @@ class Stack(Cloudformation):
     Stack class to represent how we define stacks as humans
     not how AWS expects them to be
     """
+    __slots__ = ('name', 'params', 'template', 'bucket', 'tags', 'purge',
+                 'depends_on')
+
     def __init__(
-        self,
-        name,
-        account,
-        region,
-        params=None,
-        tags=None,
-        template_body=None,
-        template_file=None,
-        bucket=None,
-        purge=False,
+            self,
+            name,
+            account,
+            region,
+            params=None,
+            tags=None,
+            template_body=None,
+            template_file=None,
+            bucket=None,
+            purge=False,
+            depends_on=(),
     ):
 
         # Adopt parent class methods/attributes
@@ -655,8 +895,8 @@ class Stack(Cloudformation):
             self.template = Template(template_body=template_body)
         else:
             s = string.Template(template_file)
-            self.template = Template(
-                template_file=s.substitute(name=name, account=account))
+            self.template = Template.from_file(
+                s.substitute(name=name, account=account))
 
         self.bucket = bucket
 
@@ -664,21 +904,57 @@ class Stack(Cloudformation):
 
         self.purge = purge
 
+        # Names of stacks in the same account and region to push first
+        self.depends_on = tuple(depends_on)
+
     @property
     def hash_of_params_and_template(self):
         """
         Hash parameters and templates to quickly determine if a stack needs to be updated
         """
-        return hashlib.sha256(
-            self.template.raw.encode('utf-8') +
-            self.params.raw.encode('utf-8')).hexdigest()
+        def compute():
+            with profiling.span('hash'):
+                return hashlib.sha256(
+                    self.template.raw.encode('utf-8') +
+                    self.params.raw.encode('utf-8')).hexdigest()
+
+        if self.template.file:
+            return FINGERPRINTS.get(self.template.file,
+                                    compute,
+                                    extra=self.params.raw)
+        return compute()
 
     @property
     def hash_of_template(self):
         """
         Hash template to use for bucket filename
         """
-        return hashlib.sha256(self.template.raw.encode('utf-8')).hexdigest()
+        def compute():
+            return hashlib.sha256(
+                self.template.raw.encode('utf-8')).hexdigest()
+
+        if self.template.file:
+            return FINGERPRINTS.get(self.template.file, compute)
+        return compute()
+
+    @property
+    def needs_upload(self):
+        """
+        Determine if the template is too large to be sent inline, which
+        is limited in bytes rather than characters
+        """
+        return len(
+            self.template.raw.encode('utf-8')) > uploads.MAX_TEMPLATE_BODY
+
+    def upload_template(self):
+        """
+        Upload the template to the bucket, unless it is already there,
+        and return its URL
+        """
+        key = uploads.template_key(self.hash_of_template)
+        uploads.upload(self.bucket_client, self.bucket['name'], key,
+                       self.template.raw)
+        return f'https://{self.bucket["name"]}.s3.{self.bucket["region"]}.amazonaws.com/{key}'
 
     def pending_update(self, stax_hash):
         """
@@ -710,43 +986,32 @@ class Stack(Cloudformation):
 
 def parse_changeset_changes(changes):
     """
-    Parse a changeset for changes
+    Parse a changeset's Change records
     and highlight what has been added,
     modified and removed
     """
     # Find out more about these attributes
     dig_into = []
+    lines = []
 
     for change in changes:
-        rc = change['ResourceChange']
-        if rc['Action'] == 'Add':
-            click.secho(
-                f'{rc["ResourceType"]} ({rc["LogicalResourceId"]}) will be added',
-                fg='green')
-        elif rc['Action'] == 'Modify':
-            mod_type = click.style(
-                'by deletion and recreation ',
-                fg='red') if rc['Replacement'] in ['True', True] else ''
-
-            scope_and_causing_entities = {
-                scope: [
-                    detail['CausingEntity'] for detail in rc['Details']
-                    if 'CausingEntity' in rc
-                ]
-                for scope in rc['Scope']
-            }
-            cause = f'caused by changes to: {scope_and_causing_entities}'
-
-            click.secho(
-                f'{rc["ResourceType"]} ({rc["LogicalResourceId"]}) will be modified {mod_type}{cause}',
-                fg='yellow')
-
-            dig_into.extend(scope_and_causing_entities.keys())
-
-        elif rc['Action'] == 'Remove':
-            click.secho(
-                f'{rc["ResourceType"]} ({rc["LogicalResourceId"]}) will be deleted',
-                fg='red')
+        resource = f'{change.resource_type} ({change.logical_id})'
+        if change.action == 'Add':
+            lines.append(click.style(f'{resource} will be added', fg='green'))
+        elif change.action == 'Modify':
+            mod_type = click.style('by deletion and recreation ',
+                                   fg='red') if change.replacement else ''
+            cause = f'caused by changes to: {change.causes}'
+            lines.append(
+                click.style(f'{resource} will be modified {mod_type}{cause}',
+                            fg='yellow'))
+            dig_into.extend(change.causes.keys())
+        elif change.action == 'Remove':
+            lines.append(click.style(f'{resource} will be deleted', fg='red'))
         else:
             raise ValueError('Unhandled change', change)
+
+    # Write large changesets out at once, rather than line by line
+    if lines:
+        click.echo('\n'.join(lines))
     return dig_into
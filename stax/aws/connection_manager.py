@@ -1,23 +1,105 @@
 """
 AWS Connection Manager
 """
+import os
+import threading
 
-import boto3
+from .. import profiling
+from ..cache import cache_dir
+from . import rate_limiter
+
+# How many connections each client keeps open, raised to suit parallel runs
+MAX_POOL_CONNECTIONS = 10
 
 _CLIENTS = {}
 _SESSIONS = {}
+_LOADER = None
+_LOCK = threading.Lock()
+
+
+def set_max_pool_connections(size):
+    """
+    Allow clients created from now on to keep up to size connections open
+    """
+    global MAX_POOL_CONNECTIONS
+    MAX_POOL_CONNECTIONS = max(MAX_POOL_CONNECTIONS, size)
+
+
+def credential_cache_enabled():
+    """
+    Cache assumed role credentials on disk when STAX_CREDENTIAL_CACHE is set
+    """
+    return os.getenv('STAX_CREDENTIAL_CACHE',
+                     '').lower() not in ('', '0', 'false')
+
+
+def new_session(profile):
+    """
+    Create a boto3 session which shares its service models with every
+    other session, and optionally caches assumed role credentials on disk
+    """
+    global _LOADER
+    import boto3
+    import botocore.session
+
+    botocore_session = botocore.session.Session(profile=profile)
+    if _LOADER is None:
+        _LOADER = botocore_session.get_component('data_loader')
+    botocore_session.register_component('data_loader', _LOADER)
+
+    if credential_cache_enabled():
+        from botocore.credentials import JSONFileCache
+        provider = botocore_session.get_component(
+            'credential_provider').get_provider('assume-role')
+        provider.cache = JSONFileCache(cache_dir('credentials'))
+
+    session = boto3.Session(botocore_session=botocore_session)
+    # boto3 adds its own data path every time it is handed the loader, so
+    # without this the shared loader would search one more path for every
+    # profile when loading each service model
+    search_paths = _LOADER.search_paths
+    search_paths[:] = list(dict.fromkeys(search_paths))
+    return session
 
 
 def get_client(profile, region, client):
     """
     Fetch an AWS Client, and store it for later use
     """
-    client_key = (profile, region)
+    client_key = (profile, region, client)
     session_key = profile
 
-    if client_key not in _CLIENTS:
-        if session_key not in _SESSIONS:
-            _SESSIONS[session_key] = boto3.Session(profile_name=profile)
-        _CLIENTS[client_key] = _SESSIONS[session_key].client(
-            client, region_name=region)
+    if client_key in _CLIENTS:
+        return _CLIENTS[client_key]
+
+    # botocore is slow to import, so only import it when needed
+    from botocore.config import Config
+
+    # Sessions aren't thread safe, so only create one client at a time
+    with _LOCK:
+        if client_key not in _CLIENTS:
+            # Retries are handled by the rate limiter rather than botocore
+            config = Config(retries={
+                'mode': 'standard',
+                'total_max_attempts': 1
+            },
+                            max_pool_connections=MAX_POOL_CONNECTIONS)
+
+            if session_key not in _SESSIONS:
+                _SESSIONS[session_key] = new_session(profile)
+            new_client = _SESSIONS[session_key].client(client,
+                                                       region_name=region,
+                                                       config=config)
+            rate_limiter.install(new_client, profile, region, client)
+            profiling.install(new_client, profile, region, client)
+            _CLIENTS[client_key] = new_client
     return _CLIENTS[client_key]
+
+
+def prewarm(client_keys):
+    """
+    Create every (profile, region, client) a run will need up front,
+    rather than have parallel workers wait on each other to create them
+    """
+    for client_key in sorted(set(client_keys)):
+        get_client(*client_key)
@@ -0,0 +1,85 @@
+"""
+Follow the events of a stack as it changes
+"""
+import botocore.exceptions
+import click
+
+FAILED_STATUS = 'FAILED'
+
+
+class EventTail:
+    """
+    Fetch only the stack events newer than any seen before
+
+    Events are listed newest first, so paging stops as soon as it reaches
+    the newest event already seen, keeping each poll to a single page no
+    matter how long the stack's history is.
+    """
+    __slots__ = ('client', 'stack_name', 'last_event_id', 'last_timestamp')
+
+    def __init__(self, client, stack_name):
+        self.client = client
+        self.stack_name = stack_name
+        self.last_event_id = None
+        self.last_timestamp = None
+
+    def prime(self):
+        """
+        Skip every event so far, eg. before executing a changeset
+        """
+        for event in self._pages():
+            self._seen(event)
+            return
+
+    def poll(self):
+        """
+        Return the events since the last poll, oldest first
+        """
+        new_events = []
+        for event in self._pages():
+            if event['EventId'] == self.last_event_id or (
+                    self.last_timestamp
+                    and event['Timestamp'] < self.last_timestamp):
+                break
+            new_events.append(event)
+
+        if new_events:
+            self._seen(new_events[0])
+        return new_events[::-1]
+
+    def _seen(self, event):
+        self.last_event_id = event['EventId']
+        self.last_timestamp = event['Timestamp']
+
+    def _pages(self):
+        """
+        Yield events newest first, fetching pages only as they are needed
+        """
+        kwargs = {'StackName': self.stack_name}
+        while True:
+            try:
+                response = self.client.describe_stack_events(**kwargs)
+            except botocore.exceptions.ClientError as err:
+                # The stack hasn't been created yet, or is gone
+                if err.response['Error']['Message'].find(
+                        'does not exist') == -1:
+                    raise
+                return
+            yield from response['StackEvents']
+            if 'NextToken' not in response:
+                return
+            kwargs['NextToken'] = response['NextToken']
+
+
+def format_event(event):
+    """
+    Return a one line, coloured summary of a stack event
+    """
+    status = event['ResourceStatus']
+    line = (f'{event["Timestamp"]:%H:%M:%S} {event["StackName"]} '
+            f'{event["LogicalResourceId"]} ({event["ResourceType"]}) {status}')
+    if event.get('ResourceStatusReason'):
+        line += f': {event["ResourceStatusReason"]}'
+    if FAILED_STATUS in status:
+        return click.style(line, fg='red')
+    return line
@@ -0,0 +1,256 @@
+"""
+Poll many stacks and changesets from a single shared thread
+"""
+import collections
+import concurrent.futures
+import math
+import threading
+import time
+
+import botocore.exceptions
+
+from ..exceptions import StackNotFound
+
+CHANGESET_PENDING_STATES = ['CREATE_PENDING', 'CREATE_IN_PROGRESS']
+DRIFT_PENDING_STATES = ['DETECTION_IN_PROGRESS']
+
+# Poll every MIN_INTERVAL seconds to begin with, then back off to a
+# BACKOFF fraction of the time spent waiting, up to MAX_INTERVAL seconds
+MIN_INTERVAL = 1
+MAX_INTERVAL = 15
+BACKOFF = 0.1
+
+# The number of stacks returned per describe_stacks page
+PAGE_SIZE = 100
+
+
+class Waiter:
+    """
+    Something waiting on the poller for a stack or changeset to settle
+    """
+    def __init__(self, stack, client, on_update=None):
+        self.name = stack.name
+        self.key = (stack.account, stack.region)
+        self.client = client
+        self.on_update = on_update
+        self.future = concurrent.futures.Future()
+        self.started = time.monotonic()
+        self.next_poll = self.started
+
+    def schedule(self, now):
+        """
+        Back off based on how long we've been waiting for
+        """
+        interval = (now - self.started) * BACKOFF
+        self.next_poll = now + min(MAX_INTERVAL, max(MIN_INTERVAL, interval))
+
+    def notify(self, status):
+        if self.on_update:
+            self.on_update(status)
+
+
+class StackWaiter(Waiter):
+    """
+    Wait for a stack to reach one of the given states
+    """
+    def __init__(self, stack, client, until, deleting=False, on_update=None):
+        super().__init__(stack, client, on_update=on_update)
+        self.until = until
+        self.deleting = deleting
+
+    def update(self, description, now):
+        """
+        Handle a fresh description of the stack, where None means it is gone
+        """
+        if description is None:
+            if self.deleting:
+                self.notify('DELETE_COMPLETE')
+                return self.future.set_result(None)
+            return self.future.set_exception(
+                StackNotFound(f'{self.name} stack no longer exists'))
+
+        status = description['StackStatus']
+        self.notify(status)
+        if status in self.until:
+            return self.future.set_result(description)
+        self.schedule(now)
+
+    def poll(self, now):
+        """
+        Describe just this stack
+        """
+        try:
+            description = self.client.describe_stacks(
+                StackName=self.name)['Stacks'][0]
+        except botocore.exceptions.ClientError as err:
+            if err.response['Error']['Message'].find('does not exist') == -1:
+                raise
+            description = None
+        self.update(description, now)
+
+
+class ChangesetWaiter(Waiter):
+    """
+    Wait for a changeset to finish being created
+    """
+    def __init__(self, stack, client, changeset_id, on_update=None):
+        super().__init__(stack, client, on_update=on_update)
+        self.changeset_id = changeset_id
+
+    def poll(self, now):
+        req = self.client.describe_change_set(ChangeSetName=self.changeset_id)
+        self.notify(req['Status'])
+        if req['Status'] not in CHANGESET_PENDING_STATES:
+            return self.future.set_result(req)
+        self.schedule(now)
+
+
+class DriftWaiter(Waiter):
+    """
+    Wait for a stack drift detection to finish
+    """
+    def __init__(self, stack, client, detection_id, on_update=None):
+        super().__init__(stack, client, on_update=on_update)
+        self.detection_id = detection_id
+
+    def poll(self, now):
+        req = self.client.describe_stack_drift_detection_status(
+            StackDriftDetectionId=self.detection_id)
+        self.notify(req['DetectionStatus'])
+        if req['DetectionStatus'] not in DRIFT_PENDING_STATES:
+            return self.future.set_result(req)
+        self.schedule(now)
+
+
+class Poller:
+    """
+    Poll the status of every stack, changeset and drift detection being
+    waited on from one thread
+
+    Stacks due a poll in the same account and region are described
+    together with one paginated describe_stacks call whenever that is
+    cheaper than describing them one by one, and each waiter backs off
+    the longer it has been waiting, to stay clear of API throttling.
+    """
+    def __init__(self):
+        self._waiters = []
+        self._condition = threading.Condition()
+        self._thread = None
+        # How many stacks each (account, region) had when last described
+        self._stack_counts = {}
+
+    def watch_stack(self, stack, until, deleting=False, on_update=None):
+        """
+        Return a future resolving to the stack description once its
+        status is in until, or None if deleting and the stack is gone
+        """
+        return self._add(
+            StackWaiter(stack,
+                        stack.client,
+                        until,
+                        deleting=deleting,
+                        on_update=on_update))
+
+    def watch_changeset(self, stack, changeset_id, on_update=None):
+        """
+        Return a future resolving to the changeset description once created
+        """
+        return self._add(
+            ChangesetWaiter(stack,
+                            stack.client,
+                            changeset_id,
+                            on_update=on_update))
+
+    def watch_drift(self, stack, detection_id, on_update=None):
+        """
+        Return a future resolving to the drift detection status once done
+        """
+        return self._add(
+            DriftWaiter(stack, stack.client, detection_id,
+                        on_update=on_update))
+
+    def _add(self, waiter):
+        with self._condition:
+            self._waiters.append(waiter)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name='stax-poller',
+                                                daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return waiter.future
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    due = [
+                        waiter for waiter in self._waiters
+                        if waiter.next_poll <= now
+                    ]
+                    if due:
+                        break
+                    timeout = None
+                    if self._waiters:
+                        timeout = min(waiter.next_poll
+                                      for waiter in self._waiters) - now
+                    self._condition.wait(timeout)
+
+            self._poll(due, now)
+
+            with self._condition:
+                self._waiters = [
+                    waiter for waiter in self._waiters
+                    if not waiter.future.done()
+                ]
+
+    def _poll(self, due, now):
+        stack_waiters = collections.defaultdict(list)
+        for waiter in due:
+            if isinstance(waiter, StackWaiter):
+                stack_waiters[waiter.key].append(waiter)
+            else:
+                self._attempt(waiter, waiter.poll, now)
+
+        for key, waiters in stack_waiters.items():
+            pages = math.ceil(self._stack_counts.get(key, 1) / PAGE_SIZE)
+            if len(waiters) > max(pages, 1):
+                self._poll_together(key, waiters, now)
+            else:
+                for waiter in waiters:
+                    self._attempt(waiter, waiter.poll, now)
+
+    def _poll_together(self, key, waiters, now):
+        """
+        Describe every stack in an account and region at once
+        """
+        try:
+            descriptions = {}
+            paginator = waiters[0].client.get_paginator('describe_stacks')
+            for response in paginator.paginate():
+                for stack in response['Stacks']:
+                    descriptions[stack['StackName']] = stack
+        except Exception as err:
+            for waiter in waiters:
+                waiter.future.set_exception(err)
+            return
+        self._stack_counts[key] = len(descriptions)
+
+        for waiter in waiters:
+            if waiter.name in descriptions:
+                self._attempt(waiter, waiter.update, descriptions[waiter.name],
+                              now)
+            else:
+                # Confirm whether the stack has really gone
+                self._attempt(waiter, waiter.poll, now)
+
+    @staticmethod
+    def _attempt(waiter, func, *args):
+        try:
+            func(*args)
+        except Exception as err:
+            waiter.future.set_exception(err)
+
+
+POLLER = Poller()
@@ -0,0 +1,188 @@
+"""
+Rate limit and retry every AWS API call
+
+Each (profile, region, service) shares a token bucket, so that
+parallel operations slow down together when AWS starts throttling
+instead of failing one by one.
+"""
+import collections
+import random
+import threading
+import time
+
+import botocore.exceptions
+
+from .. import profiling
+
+# Requests per second, and burst size, allowed for each service
+RATE_LIMITS = {
+    'cloudformation': (5, 10),
+    's3': (50, 100),
+}
+DEFAULT_RATE_LIMIT = (10, 20)
+
+# Never slow down to fewer than this many requests per second
+MIN_RATE = 0.5
+
+# Jittered exponential backoff, in seconds
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20
+MAX_ATTEMPTS = 10
+
+THROTTLING_CODES = [
+    'BandwidthLimitExceeded',
+    'LimitExceededException',
+    'PriorRequestNotComplete',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'SlowDown',
+    'Throttling',
+    'ThrottlingException',
+    'TooManyRequestsException',
+]
+
+_BUCKETS = {}
+_BUCKETS_LOCK = threading.Lock()
+
+# How often each limit was hit, by (profile, region, service, reason)
+_LIMIT_HITS = collections.Counter()
+_LIMIT_HITS_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """
+    A token bucket which halves its rate whenever requests are
+    throttled, and slowly recovers as requests succeed
+    """
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token, returning how many seconds to wait before using it
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    def throttled(self):
+        with self.lock:
+            self.rate = max(MIN_RATE, self.rate / 2)
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def get_bucket(profile, region, service):
+    """
+    Return the token bucket shared by a profile, region and service
+    """
+    key = (profile, region, service)
+    with _BUCKETS_LOCK:
+        if key not in _BUCKETS:
+            _BUCKETS[key] = TokenBucket(
+                *RATE_LIMITS.get(service, DEFAULT_RATE_LIMIT))
+        return _BUCKETS[key]
+
+
+def record_limit_hit(profile, region, service, reason):
+    with _LIMIT_HITS_LOCK:
+        _LIMIT_HITS[(profile, region, service, reason)] += 1
+
+
+def limit_hits():
+    """
+    Return how often each limit was hit, by (profile, region, service, reason)
+    """
+    with _LIMIT_HITS_LOCK:
+        return collections.Counter(_LIMIT_HITS)
+
+
+def backoff(attempts):
+    """
+    Return a full jitter exponential backoff for the given attempt
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempts))
+
+
+def retry_reason(response, caught_exception):
+    """
+    Return why a request should be retried, if it should be
+    """
+    if caught_exception is not None:
+        if isinstance(caught_exception, (botocore.exceptions.ConnectionError,
+                                         botocore.exceptions.HTTPClientError)):
+            return type(caught_exception).__name__
+        return None
+
+    http_response, parsed = response
+    code = parsed.get('Error', {}).get('Code')
+    if code in THROTTLING_CODES:
+        return code
+    if http_response.status_code >= 500:
+        return f'HTTP{http_response.status_code}'
+    return None
+
+
+def install(client, profile, region, service):
+    """
+    Retry a client's calls with rate limiting, for clients created with
+    botocore's own retries turned off
+    """
+    bucket = get_bucket(profile, region, service)
+    event_name = client.meta.service_model.service_id.hyphenize()
+
+    def before_call(**kwargs):
+        profiling.sleep(bucket.reserve(), 'rate limit', service, profile,
+                        region)
+
+    def after_call(http_response, **kwargs):
+        if http_response.status_code < 400:
+            bucket.succeeded()
+
+    def needs_retry(response=None,
+                    caught_exception=None,
+                    attempts=1,
+                    **kwargs):
+        reason = retry_reason(response, caught_exception)
+        if reason is None:
+            return None
+        record_limit_hit(profile, region, service, reason)
+        if attempts >= MAX_ATTEMPTS:
+            return None
+        if reason in THROTTLING_CODES:
+            bucket.throttled()
+        delay = max(backoff(attempts), bucket.reserve())
+        if profiling.ENABLED:
+            profiling.record(f'retry {reason}',
+                             'throttle',
+                             time.perf_counter(),
+                             delay,
+                             service=service,
+                             profile=profile,
+                             region=region)
+        return delay
+
+    client.meta.events.register(f'needs-retry.{event_name}',
+                                needs_retry,
+                                unique_id='stax-needs-retry')
+    client.meta.events.register(f'before-call.{event_name}',
+                                before_call,
+                                unique_id='stax-before-call')
+    client.meta.events.register(f'after-call.{event_name}',
+                                after_call,
+                                unique_id='stax-after-call')
@@ -0,0 +1,25 @@
+"""
+AWS Regions
+
+Kept apart from the AWS modules so the CLI can offer them as choices
+without importing boto3
+"""
+
+DEFAULT_AWS_REGIONS = [
+    'ap-northeast-1',
+    'ap-northeast-2',
+    'ap-south-1',
+    'ap-southeast-1',
+    'ap-southeast-2',
+    'ca-central-1',
+    'eu-central-1',
+    'eu-north-1',
+    'eu-west-1',
+    'eu-west-2',
+    'eu-west-3',
+    'sa-east-1',
+    'us-east-1',
+    'us-east-2',
+    'us-west-1',
+    'us-west-2',
+]
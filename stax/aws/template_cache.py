@@ -0,0 +1,197 @@
+"""
+Parse each distinct template only once
+
+Parsed templates are held in memory by the sha256 of their raw body,
+so every Stack sharing a template shares one parsed copy until the last
+of them releases it. Parsed YAML can also be kept on disk between runs
+by setting STAX_TEMPLATE_CACHE_MB to the most space the cache may use,
+as parsing YAML is slow.
+
+Parsed templates are shared, so they must be treated as read only.
+
+YAML is parsed with libyaml when it is available, keeping short form
+intrinsic functions such as !Ref in their long form, eg. {"Ref": ...},
+so that YAML and JSON templates parse alike.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from .. import files, profiling
+from ..cache import cache_dir
+
+# Bump whenever parsing changes, to ignore previously cached templates
+PARSER_VERSION = 3
+
+_PARSED = {}
+_LOCK = threading.Lock()
+_DISK_USAGE = None
+_YAML_LOADER = None
+
+# Short form functions whose long form isn't prefixed with Fn::
+UNPREFIXED_FUNCTIONS = ('Ref', 'Condition')
+
+# Implicitly typed YAML scalars which are left as strings
+UNTYPED_SCALARS = [
+    'tag:yaml.org,2002:bool',
+    'tag:yaml.org,2002:float',
+    'tag:yaml.org,2002:int',
+    'tag:yaml.org,2002:timestamp',
+]
+
+
+def parse_raw(raw):
+    """
+    Parse a raw JSON or YAML template, returning its extension and content
+    """
+    try:
+        return 'json', json.loads(raw)
+    except ValueError:
+        import yaml
+
+        return 'yaml', yaml.load(raw, Loader=yaml_loader())
+
+
+def construct_intrinsic(loader, suffix, node):
+    """
+    Construct a short form intrinsic function, eg. !GetAtt Queue.Arn,
+    in its long form, eg. {'Fn::GetAtt': ['Queue', 'Arn']}
+    """
+    import yaml
+
+    name = suffix if suffix in UNPREFIXED_FUNCTIONS else f'Fn::{suffix}'
+    if isinstance(node, yaml.ScalarNode):
+        value = loader.construct_scalar(node)
+        if suffix == 'GetAtt':
+            value = value.split('.', 1)
+    elif isinstance(node, yaml.SequenceNode):
+        value = loader.construct_sequence(node, deep=True)
+    else:
+        value = loader.construct_mapping(node, deep=True)
+    return {name: value}
+
+
+def yaml_loader():
+    """
+    Return the loader for YAML templates, built on libyaml if available
+
+    Unquoted numbers, booleans and dates are left as strings, as YAML 1.1
+    would otherwise turn eg. an account ID like 012345670123 into an octal
+    number or yes into true. This also keeps parsed templates serialisable
+    as JSON, with keys which can be sorted against each other.
+    """
+    global _YAML_LOADER
+    if _YAML_LOADER is None:
+        import yaml
+
+        class Loader(getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):
+            yaml_implicit_resolvers = {
+                first: [(tag, regexp) for tag, regexp in resolvers
+                        if tag not in UNTYPED_SCALARS]
+                for first, resolvers in
+                yaml.SafeLoader.yaml_implicit_resolvers.items()
+            }
+
+        Loader.add_multi_constructor('!', construct_intrinsic)
+        _YAML_LOADER = Loader
+    return _YAML_LOADER
+
+
+def template_key(raw):
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def forget(raw):
+    """
+    Stop holding the parsed copy of a raw template in memory
+    """
+    with _LOCK:
+        _PARSED.pop(template_key(raw), None)
+
+
+def parse(raw):
+    """
+    Return the extension and content of a raw template, parsing it
+    only if it hasn't been seen before
+    """
+    key = template_key(raw)
+    with _LOCK:
+        if key in _PARSED:
+            return _PARSED[key]
+
+    parsed = read_disk_cache(key)
+    if parsed is None:
+        with profiling.span('parse template'):
+            parsed = parse_raw(raw)
+        if parsed[0] == 'yaml':
+            write_disk_cache(key, parsed)
+
+    with _LOCK:
+        return _PARSED.setdefault(key, parsed)
+
+
+def disk_cache_limit():
+    """
+    Return the most bytes the on-disk cache may use, 0 if it is disabled
+    """
+    return int(float(os.getenv('STAX_TEMPLATE_CACHE_MB', 0)) * 1024 * 1024)
+
+
+def disk_cache_path(key=''):
+    return os.path.join(cache_dir('templates', f'v{PARSER_VERSION}'), key)
+
+
+def read_disk_cache(key):
+    if not disk_cache_limit():
+        return None
+    path = disk_cache_path(f'{key}.json')
+    try:
+        with open(path) as fh:
+            cached = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    # Record the use, so the least recently used templates are evicted first
+    os.utime(path)
+    return cached['extn'], cached['template']
+
+
+def write_disk_cache(key, parsed):
+    global _DISK_USAGE
+
+    limit = disk_cache_limit()
+    if not limit:
+        return
+    try:
+        content = json.dumps({'extn': parsed[0], 'template': parsed[1]})
+        files.atomic_write(disk_cache_path(f'{key}.json'), content)
+    except (OSError, TypeError):
+        return
+
+    with _LOCK:
+        if _DISK_USAGE is None:
+            _DISK_USAGE = sum(entry.stat().st_size
+                              for entry in os.scandir(disk_cache_path()))
+        else:
+            _DISK_USAGE += len(content)
+        if _DISK_USAGE > limit:
+            _DISK_USAGE = evict(limit)
+
+
+def evict(limit):
+    """
+    Remove the least recently used templates until under half the limit,
+    returning the space left in use
+    """
+    entries = sorted(os.scandir(disk_cache_path()),
+                     key=lambda entry: entry.stat().st_mtime)
+    usage = sum(entry.stat().st_size for entry in entries)
+    for entry in entries:
+        if usage <= limit // 2:
+            break
+        try:
+            usage -= entry.stat().st_size
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+    return usage
@@ -0,0 +1,117 @@
+"""
+Upload templates too large to send inline, once per unique body
+
+Templates are stored under the hash of their body, so an object that
+already exists never needs uploading again. Each run remembers what it
+has uploaded or seen, stacks sharing a template wait on one upload, and
+a manifest remembers recently uploaded objects between runs.
+"""
+import concurrent.futures
+import json
+import os
+import threading
+import time
+
+import botocore.exceptions
+
+from .. import files
+from ..cache import cache_dir
+
+# The largest template, in bytes, which may be passed as a TemplateBody
+MAX_TEMPLATE_BODY = 51200
+
+# Trust the manifest for this many seconds, in case lifecycle rules
+# have since removed the object from the bucket
+MANIFEST_TTL = 24 * 60 * 60
+
+MISSING_CODES = ['404', 'NoSuchKey', 'NotFound']
+
+_FUTURES = {}
+_LOCK = threading.Lock()
+_MANIFEST = None
+_MANIFEST_LOCK = threading.Lock()
+
+
+def template_key(template_hash):
+    return f'stax/stax_template_{template_hash}'
+
+
+def manifest_file():
+    return os.path.join(cache_dir(), 'uploads.json')
+
+
+def in_manifest(bucket, key):
+    """
+    Determine if an object was uploaded recently by an earlier run
+    """
+    global _MANIFEST
+    with _MANIFEST_LOCK:
+        if _MANIFEST is None:
+            try:
+                with open(manifest_file()) as fh:
+                    _MANIFEST = json.load(fh)
+            except (OSError, ValueError):
+                _MANIFEST = {}
+        uploaded = _MANIFEST.get(f'{bucket}/{key}', 0)
+    return time.time() - uploaded < MANIFEST_TTL
+
+
+def remember(bucket, key):
+    with _MANIFEST_LOCK:
+        now = time.time()
+        _MANIFEST[f'{bucket}/{key}'] = now
+        # Forget anything too old to be trusted
+        for name in [
+                name for name, uploaded in _MANIFEST.items()
+                if now - uploaded >= MANIFEST_TTL
+        ]:
+            del _MANIFEST[name]
+        try:
+            files.atomic_write(manifest_file(), json.dumps(_MANIFEST,
+                                                           indent=4))
+        except OSError:
+            pass
+
+
+def exists(client, bucket, key):
+    try:
+        client.head_object(Bucket=bucket, Key=key)
+    except botocore.exceptions.ClientError as err:
+        if err.response['Error']['Code'] in MISSING_CODES:
+            return False
+        raise
+    return True
+
+
+def upload(client, bucket, key, body):
+    """
+    Upload body to a content addressed key, unless it is already there
+
+    Returns True if body was uploaded, or False if it was already there
+    """
+    with _LOCK:
+        future = _FUTURES.get((bucket, key))
+        if future is None:
+            future = _FUTURES[(bucket, key)] = concurrent.futures.Future()
+            owner = True
+        else:
+            owner = False
+    if not owner:
+        future.result()
+        return False
+
+    try:
+        uploaded = False
+        if not in_manifest(bucket, key):
+            if not exists(client, bucket, key):
+                client.put_object(Body=body, Bucket=bucket, Key=key)
+                uploaded = True
+            remember(bucket, key)
+    except Exception as err:
+        # Let a later attempt try again
+        with _LOCK:
+            del _FUTURES[(bucket, key)]
+        future.set_exception(err)
+        raise
+    future.set_result(uploaded)
+    return uploaded
@@ -0,0 +1,16 @@
+"""
+Locate stax's on-disk caches
+"""
+import os
+
+
+def cache_dir(*parts):
+    """
+    Return (and create) a directory within the stax cache, which is
+    $STAX_CACHE_DIR or otherwise $XDG_CACHE_HOME/stax
+    """
+    base = os.getenv('STAX_CACHE_DIR') or os.path.join(
+        os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'stax')
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,93 @@
+"""
+Run the changesets saved to a plan file by stax plan
+"""
+import sys
+
+import click
+
+from .. import dag, profiling
+from ..aws.cloudformation import FAILURE_STATES, spinner
+from ..aws.connection_manager import prewarm, set_max_pool_connections
+from ..exceptions import DependencyCycle, PlanError
+from ..parallel import run_parallel
+from ..plan import apply_entry, read_plan, report, show_entry, verify_entry
+from ..utils import plural, set_stacks
+
+
+@click.command()
+@click.argument('plan_file', type=click.File('r'))
+@click.option('--concurrency',
+              type=click.IntRange(min=1),
+              default=8,
+              help='Number of stacks to change at once')
+@click.pass_context
+def apply(ctx, plan_file, concurrency):
+    """
+    Run every changeset in a plan after a single approval, provided
+    nothing has changed since it was planned
+    """
+    try:
+        entries = read_plan(plan_file)
+    except PlanError as err:
+        click.secho(str(err), fg='red', err=True)
+        sys.exit(1)
+    if not entries:
+        click.echo('No changes planned')
+        return
+
+    set_stacks(ctx)
+    planned = {}
+    for entry in entries:
+        found = ctx.obj.stacks.search(account=entry['account'],
+                                      region=entry['region'],
+                                      name=entry['name'])
+        if not found:
+            click.secho(
+                f'{entry["account"]}/{entry["region"]}/{entry["name"]} '
+                'is no longer in stax.json',
+                fg='red',
+                err=True)
+            sys.exit(1)
+        planned[found[0]] = entry
+
+    set_max_pool_connections(concurrency)
+    prewarm(key for stack in planned for key in stack.client_keys)
+    with spinner(text='Checking for changes since planning'):
+        results = run_parallel(
+            planned,
+            lambda stack: verify_entry(stack, planned[stack]),
+            concurrency=concurrency)
+    stale = [result for result in results if result.error]
+    if stale:
+        for result in stale:
+            click.secho(f'{result.item}: {result.error}', fg='red', err=True)
+        click.secho('The plan is out of date, run stax plan again',
+                    fg='red',
+                    err=True)
+        sys.exit(1)
+
+    try:
+        graph = dag.build_graph(planned)
+        dag.waves(graph)
+    except DependencyCycle as err:
+        click.secho(str(err), fg='red', err=True)
+        sys.exit(1)
+
+    for entry in entries:
+        show_entry(entry)
+    question = f'\nApply the changes to {plural(len(planned), "stack")}?'
+    with profiling.span('confirm', 'human'):
+        confirmed = click.confirm(question)
+    if not confirmed:
+        return
+
+    results = run_parallel(
+        planned,
+        lambda stack: apply_entry(stack, planned[stack]),
+        concurrency=concurrency,
+        requires=lambda stack: graph[stack],
+        succeeded=lambda status: status not in FAILURE_STATES)
+    failures = report(results)
+    if failures:
+        click.secho(f'{plural(failures, "stack")} failed', fg='red', err=True)
+        sys.exit(1)
@@ -0,0 +1,67 @@
+"""
+Compare local templates with live stacks
+"""
+import sys
+
+import click
+
+from ..aws.connection_manager import prewarm, set_max_pool_connections
+from ..diff import diff_templates, format_difference
+from ..parallel import run_parallel
+from ..utils import (accounts_regions_and_names, class_filter, plural,
+                     set_stacks)
+
+
+def diff_stack(stack):
+    """
+    Return the Differences between a live stack's template and our own,
+    or None if the stack doesn't exist
+    """
+    remote = stack.fetch_remote_template()
+    if remote is None:
+        return None
+    return diff_templates(remote.to_dict, stack.template.to_dict)
+
+
+@click.command()
+@accounts_regions_and_names
+@click.option('--concurrency',
+              type=click.IntRange(min=1),
+              default=8,
+              help='How many live templates to fetch at once')
+def diff(ctx, accounts, regions, names, concurrency):
+    """
+    Show how local templates differ from live stacks, exiting with 1
+    if any differ
+    """
+    set_stacks(ctx)
+    count, found_stacks = class_filter(ctx.obj.stacks,
+                                       account=accounts,
+                                       region=regions,
+                                       name=names)
+    found_stacks = [stack for stack in found_stacks if not stack.purge]
+    click.echo(f'Found {plural(len(found_stacks), "local stack")}\n')
+
+    set_max_pool_connections(concurrency)
+    prewarm(stack.client_keys[0] for stack in found_stacks)
+    results = run_parallel(found_stacks, diff_stack, concurrency=concurrency)
+
+    changed = 0
+    for result in sorted(results, key=lambda x: repr(x.item)):
+        if result.error:
+            changed += 1
+            click.secho(f'{result.item}: {result.error}', fg='red')
+        elif result.value is None:
+            changed += 1
+            click.secho(f'{result.item}: not deployed', fg='yellow')
+        elif result.value:
+            changed += 1
+            click.secho(
+                f'{result.item}: {plural(len(result.value), "difference")}',
+                bold=True)
+            click.echo('\n'.join(
+                format_difference(difference) for difference in result.value))
+
+    click.echo(f'\nDifferences found in {plural(changed, "stack")}')
+    if changed:
+        sys.exit(1)
@@ -0,0 +1,163 @@
+"""
+Detect drift between live stacks and their templates
+"""
+import concurrent.futures
+import json
+import sys
+
+import click
+
+from ..aws.connection_manager import prewarm, set_max_pool_connections
+from ..parallel import run_parallel
+from ..utils import (accounts_regions_and_names, class_filter, plural,
+                     set_stacks)
+
+DRIFT_COLOURS = {
+    'IN_SYNC': 'green',
+    'DRIFTED': 'red',
+    'NOT_DEPLOYED': 'yellow',
+    'UNKNOWN': 'yellow',
+}
+
+
+def drift_stack(stack, detection, echo):
+    """
+    Summarise a stack's drift from its finished detection, which is None
+    if it isn't deployed, echoing each drifted resource as it is found
+    """
+    summary = {
+        'account': stack.account,
+        'region': stack.region,
+        'name': stack.name,
+        'status': 'NOT_DEPLOYED',
+        'drifted_resources': [],
+    }
+    if detection is None:
+        return summary
+
+    status = detection.result()
+
+    summary['status'] = status.get('StackDriftStatus', 'UNKNOWN')
+    if status['DetectionStatus'] == 'DETECTION_FAILED':
+        summary['reason'] = status.get('DetectionStatusReason')
+    if summary['status'] != 'DRIFTED':
+        return summary
+
+    for drift in stack.drifted_resources():
+        status = drift['StackResourceDriftStatus']
+        differences = [{
+            key: difference.get(key)
+            for key in ('PropertyPath', 'DifferenceType', 'ExpectedValue',
+                        'ActualValue')
+        } for difference in drift.get('PropertyDifferences', [])]
+        resource = {
+            'logical_id': drift['LogicalResourceId'],
+            'physical_id': drift.get('PhysicalResourceId'),
+            'type': drift['ResourceType'],
+            'status': status,
+            'differences': differences,
+        }
+        summary['drifted_resources'].append(resource)
+
+        echo(
+            click.style(
+                f'{stack}: {resource["logical_id"]} ({resource["type"]}) {status}',
+                fg='red' if status == 'DELETED' else 'yellow'))
+        for difference in differences:
+            echo(
+                f'  {difference["PropertyPath"]}: '
+                f'{difference["ExpectedValue"]} -> {difference["ActualValue"]}'
+            )
+    return summary
+
+
+@click.command()
+@accounts_regions_and_names
+@click.option('--concurrency',
+              type=click.IntRange(min=1),
+              default=8,
+              help='How many drift detections to run at once')
+@click.option(
+    '--output',
+    type=click.File('w'),
+    help="Write a JSON summary of each stack's drift, or - for stdout")
+def drift(ctx, accounts, regions, names, concurrency, output):
+    """
+    Detect drift on live stacks, exiting with 1 if any have drifted
+    """
+    set_stacks(ctx)
+    count, found_stacks = class_filter(ctx.obj.stacks,
+                                       account=accounts,
+                                       region=regions,
+                                       name=names)
+    found_stacks = [stack for stack in found_stacks if not stack.purge]
+
+    # Keep stdout clean when the summary is written there
+    err = output is not None and output.name == '<stdout>'
+
+    def echo(message=''):
+        click.echo(message, err=err)
+
+    echo(f'Detecting drift on {plural(len(found_stacks), "stack")}\n')
+
+    set_max_pool_connections(concurrency)
+    prewarm(stack.client_keys[0] for stack in found_stacks)
+    # Start every detection before waiting on any, so the poller can
+    # check on all of them together while they run
+    started = run_parallel(found_stacks,
+                           lambda stack: stack.detect_drift(),
+                           concurrency=concurrency)
+    summaries = {}
+    failures = 0
+    echo()
+
+    def record(stack, summary):
+        summaries[repr(stack)] = summary
+        line = f'{stack}: {summary["status"]}'
+        if summary['drifted_resources']:
+            line += f' ({plural(len(summary["drifted_resources"]), "resource")})'
+        if summary.get('reason'):
+            line += f' - {summary["reason"]}'
+        echo(
+            click.style(line,
+                        fg=DRIFT_COLOURS.get(summary['status'], 'yellow')))
+
+    def record_failure(stack, error):
+        nonlocal failures
+        failures += 1
+        echo(click.style(f'{stack}: {error}', fg='red'))
+        summaries[repr(stack)] = {
+            'account': stack.account,
+            'region': stack.region,
+            'name': stack.name,
+            'status': 'FAILED',
+            'reason': str(error),
+            'drifted_resources': [],
+        }
+
+    detections = {}
+    for result in started:
+        if result.error:
+            record_failure(result.item, result.error)
+        elif result.value is None:
+            record(result.item, drift_stack(result.item, None, echo))
+        else:
+            detections[result.value] = result.item
+
+    # Report each stack as soon as its detection finishes
+    for future in concurrent.futures.as_completed(detections):
+        stack = detections[future]
+        try:
+            record(stack, drift_stack(stack, future, echo))
+        except Exception as err:
+            record_failure(stack, err)
+
+    summaries = [summaries[name] for name in sorted(summaries)]
+    if output:
+        json.dump(summaries, output, indent=4, sort_keys=True)
+        output.write('\n')
+
+    drifted = sum(summary['status'] == 'DRIFTED' for summary in summaries)
+    echo(f'\n{plural(drifted, "stack")} drifted')
+    if drifted or failures:
+        sys.exit(1)
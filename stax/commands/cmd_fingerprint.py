@@ -0,0 +1,25 @@
+"""
+Show the STAX_HASH of local stacks
+"""
+import click
+
+from ..utils import accounts_regions_and_names, class_filter, set_stacks
+
+
+@click.command()
+@accounts_regions_and_names
+def fingerprint(ctx, accounts, regions, names):
+    """
+    Show the STAX_HASH of local stacks
+    """
+    set_stacks(ctx)
+    count, found_stacks = class_filter(ctx.obj.stacks,
+                                       account=accounts,
+                                       region=regions,
+                                       name=names)
+
+    click.echo('Account,Region,Name,Hash')
+    for stack in sorted(found_stacks, key=repr):
+        click.echo(
+            f'{stack.account},{stack.region},{stack.name},{stack.hash_of_params_and_template}'
+        )
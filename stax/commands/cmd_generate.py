@@ -36,6 +36,8 @@ def generate():
                 'template': 'my_stack_which_does_not_require_params.json',
             },
             'the_name_of_stack_2_that_uses_the_default_region': {
+                'depends_on':
+                ['the_name_of_stack_1_that_uses_the_default_region'],
                 'parameters': {
                     'staging': {
                         'REDIS_USERNAME': 'this_is_an_example_param_value'
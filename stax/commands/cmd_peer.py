@@ -4,7 +4,6 @@ Peer into the outputs and resources of a stack
 import collections
 
 import click
-import halo
 
 from ..utils import (accounts_regions_and_names, class_filter, plural,
                      set_stacks)
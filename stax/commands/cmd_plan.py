@@ -0,0 +1,75 @@
+"""
+Create changesets for review, and save them to a plan file
+"""
+import sys
+
+import click
+
+from ..aws.connection_manager import prewarm, set_max_pool_connections
+from ..parallel import run_parallel
+from ..plan import pending_stacks, plan_stack, show_entry, write_plan
+from ..utils import (accounts_regions_and_names, class_filter, plural,
+                     set_stacks)
+
+
+@click.command()
+@accounts_regions_and_names
+@click.option('--output',
+              '-o',
+              'plan_file',
+              type=click.File('w', lazy=True),
+              required=True,
+              help='Where to save the plan')
+@click.option('--force',
+              is_flag=True,
+              help='Create changesets without comparing STAX_HASH tags')
+@click.option('--use-existing-params', is_flag=True)
+@click.option('--skip-tags', is_flag=True)
+@click.option('--concurrency',
+              type=click.IntRange(min=1),
+              default=8,
+              help='Number of changesets to create at once')
+@click.option('--changed-since',
+              metavar='REVISION',
+              help='Only plan stacks whose files changed since a git revision')
+def plan(ctx, accounts, regions, names, plan_file, force, use_existing_params,
+         skip_tags, concurrency, changed_since):
+    """
+    Create changesets for every stack needing changes at once, and save
+    them as a plan to be run with stax apply
+    """
+    set_stacks(ctx, changed_since=changed_since)
+    count, found_stacks = class_filter(ctx.obj.stacks,
+                                       account=accounts,
+                                       region=regions,
+                                       name=names)
+    click.echo(f'Found {plural(count, "local stack")}')
+
+    set_max_pool_connections(concurrency)
+    compare_hashes = not (len(found_stacks) < 20 or names or force)
+    to_change = pending_stacks(ctx, found_stacks, compare_hashes, concurrency)
+
+    prewarm(key for stack in to_change for key in stack.client_keys)
+    results = run_parallel(
+        to_change,
+        lambda stack: plan_stack(stack, use_existing_params, skip_tags),
+        concurrency=concurrency)
+
+    entries = []
+    failures = 0
+    for result in sorted(results, key=lambda x: repr(x.item)):
+        if result.error:
+            failures += 1
+            click.secho(f'{result.item}: {result.error}', fg='red', err=True)
+        elif result.value:
+            entries.append(result.value)
+            show_entry(result.value)
+
+    write_plan(plan_file, entries)
+    click.echo(f'\nPlanned changes to {plural(len(entries), "stack")}, '
+               f'run "stax apply {plan_file.name}" to make them')
+    if failures:
+        click.secho(f'{plural(failures, "stack")} failed to plan',
+                    fg='red',
+                    err=True)
+        sys.exit(1)
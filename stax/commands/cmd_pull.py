@@ -1,9 +1,17 @@
 """
 Pull AWS Cloudformation stacks to local state
 """
+import collections
+import itertools
+import sys
+
 import click
 
 from ..aws.cloudformation import Cloudformation
+from ..aws.connection_manager import prewarm, set_max_pool_connections
+from ..exceptions import ConfigError
+from ..files import read_config, write_config
+from ..parallel import run_parallel
 from ..utils import (accounts_regions_and_names, class_filter, plural,
                      set_stacks)
 
@@ -11,7 +19,11 @@ from ..utils import (accounts_regions_and_names, class_filter, plural,
 @click.command()
 @accounts_regions_and_names
 @click.option('--force', is_flag=True)
-def pull(ctx, accounts, regions, names, force):
+@click.option('--concurrency',
+              type=click.IntRange(min=1),
+              default=8,
+              help='Number of regions, or templates, to fetch at once')
+def pull(ctx, accounts, regions, names, force, concurrency):
     """
     Pull live stacks
     """
@@ -24,11 +36,56 @@ def pull(ctx, accounts, regions, names, force):
 
     click.echo(f'Found {plural(count, "existing local stack")}')
 
-    for account in accounts:
-        print('pulling account', account)
-        for region in regions:
-            print('pulling region', region)
-            cf = Cloudformation(account=account, region=region)
-            cf.generate_stacks(local_stacks=found_stacks,
-                               stack_names=names,
+    account_regions = [(account, region) for account in accounts
+                       for region in regions]
+    set_max_pool_connections(concurrency)
+    prewarm(
+        Cloudformation(account=account, region=region).client_keys[0]
+        for account, region in account_regions)
+
+    def describe(key):
+        account, region = key
+        cf = Cloudformation(account=account, region=region)
+        return cf.remote_stacks(stack_names=names)
+
+    def fetch(item):
+        (account, region), remote_stack = item
+        cf = Cloudformation(account=account, region=region)
+        return cf.fetch_stack(remote_stack)
+
+    # Describe every account and region at once
+    described = run_parallel(account_regions,
+                             describe,
+                             concurrency=concurrency)
+
+    # Then fetch the templates of every account and region at once
+    remote_stacks = [(result.item, remote_stack) for result in described
+                     if not result.error for remote_stack in result.value]
+    fetched = collections.defaultdict(list)
+    for result in run_parallel(remote_stacks, fetch, concurrency=concurrency):
+        fetched[result.item[0]].append(result)
+
+    # But save them in order, just as if they were pulled one by one,
+    # writing stax.json just once at the end
+    local_stacks = set(found_stacks)
+    try:
+        stack_json = read_config()
+    except ConfigError as err:
+        click.echo(str(err), err=True)
+        sys.exit(1)
+    try:
+        for account, account_results in itertools.groupby(
+                described, key=lambda result: result.item[0]):
+            print('pulling account', account)
+            for result in account_results:
+                region = result.item[1]
+                print('pulling region', region)
+                if result.error:
+                    raise result.error
+                cf = Cloudformation(account=account, region=region)
+                cf.save_stacks(fetched[result.item],
+                               stack_json,
+                               local_stacks=local_stacks,
                                force=force)
+    finally:
+        write_config(stack_json)
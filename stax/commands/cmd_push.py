@@ -1,84 +1,151 @@
 """
 Push local state to AWS Cloudformation
 """
-import collections
 import sys
+import time
 
 import click
-import halo
 
-from ..aws.cloudformation import Cloudformation
-from ..exceptions import StackNotFound
+from .. import dag, profiling
+from ..aws.cloudformation import FAILURE_STATES
+from ..aws.connection_manager import prewarm, set_max_pool_connections
+from ..exceptions import ChangesetError, DependencyCycle, StackNotFound
+from ..parallel import run_parallel
+from ..plan import pending_stacks, report
 from ..utils import (accounts_regions_and_names, class_filter, plural,
                      set_stacks)
 
 
+def push_stack(stack, use_existing_params, skip_tags):
+    """
+    Create, update or delete a single stack
+
+    Returns the final stack status, or None if nothing was executed
+    """
+    if stack.purge is False:
+        # Update should be more common than create, so let's assume that and save time
+        try:
+            return stack.update(use_existing_params=use_existing_params,
+                                skip_tags=skip_tags)
+        except StackNotFound:
+            return stack.create()
+    elif stack.exists:
+        return stack.delete()
+
+
 @click.command()
 @accounts_regions_and_names
 @click.option('--force', is_flag=True)
 @click.option('--use-existing-params', is_flag=True)
 @click.option('--skip-tags', is_flag=True)
-def push(ctx, accounts, regions, names, force, use_existing_params, skip_tags):
+@click.option('--concurrency',
+              type=click.IntRange(min=1),
+              default=1,
+              help='Number of stacks to push at once')
+@click.option('--account-concurrency',
+              type=click.IntRange(min=1),
+              help='Maximum number of stacks to push at once per account')
+@click.option(
+    '--region-concurrency',
+    type=click.IntRange(min=1),
+    help='Maximum number of stacks to push at once per account/region')
+@click.option('--changed-since',
+              metavar='REVISION',
+              help='Only push stacks whose files changed since a git revision')
+def push(ctx, accounts, regions, names, force, use_existing_params, skip_tags,
+         concurrency, account_concurrency, region_concurrency, changed_since):
     """
     Create/Update live stacks
     """
-    set_stacks(ctx)
+    set_stacks(ctx, changed_since=changed_since)
     count, found_stacks = class_filter(ctx.obj.stacks,
                                        account=accounts,
                                        region=regions,
                                        name=names)
 
     click.echo(f'Found {plural(count, "local stack")}')
-
-    describe_stacks = collections.defaultdict(dict)
-    to_change = []
-
-    for stack in found_stacks:
-        ctx.obj.debug(
-            f'Found {stack.name} in region {stack.region} with account number {stack.account_id}'
-        )
-
-        # If we have a small number of stacks, it's faster to just create changesets
-        if (len(found_stacks) < 20 or name or force or stack.purge):
-            if stack.purge:
-                ctx.obj.debug(f'Checking to see if {stack.name} still exists')
-                if not stack.exists:
-                    continue
-            to_change.append(stack)
-        # Use describe stacks and compare STAX_HASH tag
-        else:
-            key = f'{stack.account},{stack.region}'
-            if key not in describe_stacks:
-                cf = Cloudformation(account=stack.account, region=stack.region)
-                with halo.Halo('Fetching stack status'):
-                    describe_stacks[key] = cf.describe_stacks()
-            try:
-                stax_hash = [
-                    tag['Value']
-                    for tag in describe_stacks[key][stack.name]['Tags']
-                    if tag['Key'] == 'STAX_HASH'
-                ][0]
-            except (KeyError, IndexError):
-                stax_hash = None
-            if stack.pending_update(stax_hash):
-                to_change.append(stack)
     if not found_stacks:
+        # Nothing changing since a revision is fine, eg. in CI
+        if changed_since:
+            click.echo(f'No stacks changed since {changed_since}')
+            return
         click.echo('No stacks found to update')
         sys.exit(1)
 
+    set_max_pool_connections(concurrency)
+    compare_hashes = not (len(found_stacks) < 20 or names or force)
+    to_change = pending_stacks(ctx, found_stacks, compare_hashes, concurrency)
+
     print('{} to update... {}\n'.format(
         plural(len(to_change), 'stack'),
         [stack.name for stack in to_change] if to_change else ''))
-    # Update should be more common than create, so let's assume that and save time
-    for stack in to_change:
-        if stack.purge is False:
-            try:
-                stack.update(use_existing_params=use_existing_params,
-                             skip_tags=skip_tags)
-            except StackNotFound:
-                stack.create()
+
+    # Push stacks after those whose exports they import, which a lone
+    # stack needn't parse its template to find out
+    try:
+        with profiling.span('dependencies'):
+            if len(to_change) > 1:
+                graph = dag.build_graph(to_change)
             else:
-                ctx.obj.debug(f'No change required for {stack.name}')
-        else:
-            if stack.exists:
-                stack.delete()
+                graph = {stack: set() for stack in to_change}
+            stack_waves = dag.waves(graph)
+    except DependencyCycle as err:
+        click.secho(str(err), fg='red', err=True)
+        sys.exit(1)
+    if len(stack_waves) > 1:
+        click.echo(f'Pushing in {plural(len(stack_waves), "wave")} of '
+                   'dependent stacks\n')
+
+    durations = {}
+
+    def timed_push(stack):
+        started = time.perf_counter()
+        try:
+            return push_stack(stack, use_existing_params, skip_tags)
+        finally:
+            durations[stack] = time.perf_counter() - started
+
+    def report_critical_path():
+        if len(stack_waves) > 1:
+            path, total = dag.critical_path(graph, durations)
+            click.echo(f'\nCritical path ({total:.0f}s): ' +
+                       ' -> '.join(repr(stack) for stack in path))
+
+    if concurrency == 1:
+        failed = set()
+        skipped = 0
+        for stack in (stack for wave in stack_waves for stack in wave):
+            if graph[stack] & failed:
+                failed.add(stack)
+                skipped += 1
+                click.secho(f'{stack}: skipped, as a dependency failed',
+                            fg='red')
+                continue
+            try:
+                status = timed_push(stack)
+            except ChangesetError:
+                sys.exit(1)
+            if status in FAILURE_STATES:
+                failed.add(stack)
+        report_critical_path()
+        if skipped:
+            sys.exit(1)
+        return
+
+    prewarm(key for stack in to_change for key in stack.client_keys)
+
+    results = run_parallel(
+        to_change,
+        timed_push,
+        concurrency=concurrency,
+        limits=[
+            (lambda stack: stack.account, account_concurrency),
+            (lambda stack: (stack.account, stack.region), region_concurrency),
+        ],
+        requires=lambda stack: graph[stack],
+        succeeded=lambda status: status not in FAILURE_STATES)
+    failures = report(results)
+    report_critical_path()
+    if failures:
+        click.secho(f'{plural(failures, "stack")} failed', fg='red', err=True)
+        sys.exit(1)
@@ -0,0 +1,229 @@
+"""
+Order stacks by the exports they import from each other
+
+A stack depends on every other stack being pushed in the same account
+and region which exports a name it imports with Fn::ImportValue, and
+on any stacks named in its depends_on within stax.json.
+"""
+import re
+
+from .exceptions import DependencyCycle
+
+SUB_VARIABLE = re.compile(r'\$\{([^}]*)\}')
+
+
+def resolve(value, variables):
+    """
+    Resolve an export name, returning None if it can't be known locally
+
+    Export names are usually literal, or built with Fn::Sub, Fn::Join
+    and Ref from parameters and the AWS::StackName, AWS::Region and
+    AWS::AccountId pseudo parameters.
+    """
+    if isinstance(value, str):
+        return value
+    if not isinstance(value, dict) or len(value) != 1:
+        return None
+
+    (function, args), = value.items()
+    if function == 'Ref':
+        return variables.get(args) if isinstance(args, str) else None
+
+    if function == 'Fn::Join':
+        try:
+            delimiter, parts = args
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(parts, list):
+            return None
+        parts = [resolve(part, variables) for part in parts]
+        if None in parts or not isinstance(delimiter, str):
+            return None
+        return delimiter.join(parts)
+
+    if function == 'Fn::Sub':
+        if isinstance(args, list):
+            if len(args) != 2 or not isinstance(args[1], dict):
+                return None
+            template, extra = args
+            variables = dict(variables)
+            for name, extra_value in extra.items():
+                variables[name] = resolve(extra_value, variables)
+        else:
+            template = args
+        if not isinstance(template, str):
+            return None
+
+        unresolved = []
+
+        def substitute(match):
+            name = match.group(1)
+            # ${!Literal} is written out as ${Literal}
+            if name.startswith('!'):
+                return '${' + name[1:] + '}'
+            if variables.get(name) is None:
+                unresolved.append(name)
+                return ''
+            return variables[name]
+
+        resolved = SUB_VARIABLE.sub(substitute, template)
+        return None if unresolved else resolved
+
+    return None
+
+
+def parameter_value(value):
+    """
+    Return a parameter value as the string CloudFormation would pass,
+    or None if it isn't a scalar
+    """
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    return None
+
+
+def template_variables(stack):
+    """
+    Return the values Ref and Fn::Sub may use within a stack's template
+    """
+    template = stack.template.to_dict
+    variables = {
+        name: parameter_value(parameter.get('Default'))
+        for name, parameter in template.get('Parameters', {}).items()
+        if isinstance(parameter, dict)
+    }
+    variables.update({
+        name: parameter_value(value)
+        for name, value in (stack.params.to_dict or {}).items()
+    })
+    variables.update({
+        'AWS::StackName': stack.name,
+        'AWS::Region': stack.region,
+        'AWS::AccountId': stack.account_id,
+    })
+    return variables
+
+
+def find_imports(value):
+    """
+    Yield the argument of every Fn::ImportValue within a parsed template
+    """
+    if isinstance(value, dict):
+        for key, child in value.items():
+            if key == 'Fn::ImportValue':
+                yield child
+            else:
+                yield from find_imports(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from find_imports(child)
+
+
+def exports(stack):
+    """
+    Return the names a stack exports, where they can be resolved
+    """
+    template = stack.template.to_dict
+    variables = template_variables(stack)
+    names = set()
+    for output in template.get('Outputs', {}).values():
+        if isinstance(output, dict) and isinstance(output.get('Export'), dict):
+            names.add(resolve(output['Export'].get('Name'), variables))
+    names.discard(None)
+    return names
+
+
+def imports(stack):
+    """
+    Return the export names a stack imports, where they can be resolved
+    """
+    variables = template_variables(stack)
+    names = {
+        resolve(value, variables)
+        for value in find_imports(stack.template.to_dict)
+    }
+    names.discard(None)
+    return names
+
+
+def build_graph(stacks):
+    """
+    Return a dict of each stack to the set of stacks it must follow
+
+    Only the given stacks are considered, as any others are assumed to
+    be deployed already. Stacks being purged are left unordered.
+    """
+    stacks = list(stacks)
+    exporters = {}
+    by_name = {}
+    for stack in stacks:
+        by_name[(stack.account, stack.region, stack.name)] = stack
+        if not stack.purge:
+            for name in exports(stack):
+                exporters[(stack.account, stack.region, name)] = stack
+
+    graph = {}
+    for stack in stacks:
+        graph[stack] = set()
+        if stack.purge:
+            continue
+        for name in imports(stack):
+            graph[stack].add(exporters.get(
+                (stack.account, stack.region, name)))
+        for name in stack.depends_on:
+            graph[stack].add(by_name.get((stack.account, stack.region, name)))
+        graph[stack].discard(None)
+        graph[stack].discard(stack)
+    return graph
+
+
+def waves(graph):
+    """
+    Return the stacks in a graph as a list of waves, where each stack
+    only depends on stacks in earlier waves
+
+    Raises DependencyCycle if the stacks can't be ordered.
+    """
+    remaining = {stack: set(upstream) for stack, upstream in graph.items()}
+    ordered = []
+    while remaining:
+        wave = [stack for stack, upstream in remaining.items() if not upstream]
+        if not wave:
+            cycle = ', '.join(sorted(repr(stack) for stack in remaining))
+            raise DependencyCycle(f'Stacks depend on each other: {cycle}')
+        for stack in wave:
+            del remaining[stack]
+        for upstream in remaining.values():
+            upstream.difference_update(wave)
+        ordered.append(wave)
+    return ordered
+
+
+def critical_path(graph, durations):
+    """
+    Return the chain of dependent stacks which took longest in total,
+    and how long it took, from a dict of each stack's duration
+    """
+    finish = {}
+    previous = {}
+    for wave in waves(graph):
+        for stack in wave:
+            before = max(graph[stack],
+                         key=lambda upstream: finish[upstream],
+                         default=None)
+            previous[stack] = before
+            finish[stack] = durations.get(stack, 0)
+            if before is not None:
+                finish[stack] += finish[before]
+
+    if not finish:
+        return [], 0
+    stack = max(finish, key=lambda stack: finish[stack])
+    total = finish[stack]
+    path = []
+    while stack is not None:
+        path.append(stack)
+        stack = previous[stack]
+    return path[::-1], total
@@ -0,0 +1,84 @@
+"""
+Compare parsed templates structurally, resource by resource
+"""
+import collections
+import json
+
+import click
+
+# kind is added, removed or changed, and path is a list of keys and indexes
+Difference = collections.namedtuple('Difference',
+                                    ['kind', 'path', 'before', 'after'])
+
+MISSING = object()
+
+
+def normalise(value):
+    """
+    Compare scalars by their text, as CloudFormation reads them, eg. so
+    that 1 and '1' or true and 'true' match
+    """
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, (int, float)):
+        return str(value)
+    return value
+
+
+def diff_values(before, after, path):
+    """
+    Yield the Differences between two parsed values
+    """
+    if before is MISSING:
+        yield Difference('added', path, None, after)
+    elif after is MISSING:
+        yield Difference('removed', path, before, None)
+    elif isinstance(before, dict) and isinstance(after, dict):
+        for key in before.keys() | after.keys():
+            yield from diff_values(before.get(key, MISSING),
+                                   after.get(key, MISSING), path + [key])
+    elif isinstance(before, list) and isinstance(after, list):
+        for index in range(max(len(before), len(after))):
+            yield from diff_values(
+                before[index] if index < len(before) else MISSING,
+                after[index] if index < len(after) else MISSING,
+                path + [index])
+    elif normalise(before) != normalise(after):
+        yield Difference('changed', path, before, after)
+
+
+def diff_templates(before, after):
+    """
+    Return the Differences between two parsed templates, sorted by path,
+    so that whole resources are added or removed, and only the changed
+    properties of other resources are shown
+    """
+    return sorted(diff_values(before or {}, after or {}, []),
+                  key=lambda difference: difference.path)
+
+
+def format_path(path):
+    """
+    Format a path as eg. Resources.Topic.Properties.Tags[0].Value
+    """
+    formatted = ''
+    for key in path:
+        if isinstance(key, int):
+            formatted += f'[{key}]'
+        else:
+            formatted += f'.{key}' if formatted else key
+    return formatted
+
+
+def format_difference(difference):
+    """
+    Return a coloured, one line summary of a Difference
+    """
+    path = format_path(difference.path)
+    if difference.kind == 'added':
+        return click.style(f'+ {path}', fg='green')
+    if difference.kind == 'removed':
+        return click.style(f'- {path}', fg='red')
+    before = json.dumps(difference.before, default=str)
+    after = json.dumps(difference.after, default=str)
+    return click.style(f'~ {path}: {before} -> {after}', fg='yellow')
@@ -4,3 +4,23 @@ class StaxException(Exception):
 
 class StackNotFound(StaxException):
     pass
+
+
+class ChangesetError(StaxException):
+    pass
+
+
+class DependencyCycle(StaxException):
+    pass
+
+
+class DependencyFailed(StaxException):
+    pass
+
+
+class PlanError(StaxException):
+    pass
+
+
+class ConfigError(StaxException):
+    pass
@@ -0,0 +1,113 @@
+"""
+File Helpers
+"""
+import json
+import os
+import tempfile
+
+CONFIG_FILE = 'stax.json'
+CONFIG_DIR = 'stax.d'
+
+
+def read_umask():
+    """
+    Return the process umask, without changing it where possible
+    """
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    # Otherwise it can only be read by briefly setting it
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Read once at import, before any worker threads start creating files,
+# as setting it even briefly affects every thread in the process
+_UMASK = read_umask()
+
+
+def atomic_write(filename, content):
+    """
+    Write to a temporary file and rename it into place, so that
+    readers never see a partially written file
+    """
+    directory, basename = os.path.split(filename)
+    fd, tmp = tempfile.mkstemp(dir=directory or '.',
+                               prefix=f'.{basename}.',
+                               suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fh:
+            # mkstemp creates files only we can read, so give the new file
+            # the mode of the one it replaces, or the usual default
+            try:
+                mode = os.stat(filename).st_mode
+            except FileNotFoundError:
+                mode = 0o666 & ~_UMASK
+            os.fchmod(fh.fileno(), mode & 0o7777)
+            fh.write(content)
+        os.replace(tmp, filename)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_if_changed(filename, content):
+    """
+    Atomically write content to a file, unless the file already holds
+    exactly that content, leaving its mtime alone
+
+    Returns whether the file was written
+    """
+    try:
+        if os.stat(filename).st_size == len(content.encode('utf-8')):
+            with open(filename) as fh:
+                if fh.read() == content:
+                    return False
+    except FileNotFoundError:
+        pass
+    atomic_write(filename, content)
+    return True
+
+
+def read_config():
+    """
+    Read stax.json straight from disk, along with the stacks of every
+    fragment in stax.d
+    """
+    with open(CONFIG_FILE) as fh:
+        config = json.load(fh)
+    if os.path.isdir(CONFIG_DIR):
+        from .fragments import FragmentStacks
+
+        config['stacks'] = dict(
+            FragmentStacks(config.get('stacks', {}), CONFIG_DIR))
+    return config
+
+
+def write_config(config):
+    """
+    Write stax.json in one go, if it has changed, writing stacks defined
+    in stax.d fragments back to their fragments
+    """
+    if os.path.isdir(CONFIG_DIR):
+        from .fragments import FragmentStacks
+
+        fragments = FragmentStacks({}, CONFIG_DIR)
+        stacks = config['stacks']
+        fragments.write({
+            name: stack
+            for name, stack in stacks.items() if fragments.source(name)
+        })
+        config = dict(config,
+                      stacks={
+                          name: stack
+                          for name, stack in stacks.items()
+                          if not fragments.source(name)
+                      })
+    return write_if_changed(CONFIG_FILE,
+                            json.dumps(config, sort_keys=True, indent=4))
@@ -0,0 +1,86 @@
+"""
+Remember file hashes between runs
+
+Hashes are keyed by a file's path, size and mtime, so checking
+thousands of unchanged files only needs a stat of each.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from . import files
+from .cache import cache_dir
+
+# Files modified this recently may be modified again within the same
+# mtime tick, so their hashes aren't remembered
+RACY_SECONDS = 2
+
+
+class FingerprintCache:
+    def __init__(self, filename=None):
+        self._filename = filename
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @property
+    def filename(self):
+        if self._filename is None:
+            self._filename = os.path.join(cache_dir(), 'fingerprints.json')
+        return self._filename
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            try:
+                with open(self.filename) as fh:
+                    self._entries = json.load(fh)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, filename, compute, extra=''):
+        """
+        Return compute(), which must be a hash of filename and extra,
+        from the cache if filename hasn't changed since it was last hashed
+        """
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return compute()
+
+        key = os.path.abspath(filename)
+        if extra:
+            key += ':' + hashlib.sha256(extra.encode('utf-8')).hexdigest()
+        fingerprint = [stat.st_size, stat.st_mtime_ns]
+
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry and entry[:2] == fingerprint:
+            return entry[2]
+
+        value = compute()
+        if time.time() - stat.st_mtime > RACY_SECONDS:
+            with self._lock:
+                self.entries[key] = fingerprint + [value]
+                self._dirty = True
+        return value
+
+    def save(self):
+        """
+        Persist any new hashes
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                files.atomic_write(self.filename,
+                                   json.dumps(self.entries, sort_keys=True))
+            except OSError:
+                return
+            self._dirty = False
+
+
+FINGERPRINTS = FingerprintCache()
@@ -0,0 +1,243 @@
+"""
+Read stacks split out of stax.json into fragments within stax.d
+
+Each fragment is a JSON file holding some of the stacks, eg. one per
+team, as {"stacks": {...}}. An index of which stacks, parameter keys and
+files each fragment defines is compiled and cached by the fragment's
+mtime and size, so a command targeting a few stacks only parses their
+fragments.
+"""
+import collections.abc
+import hashlib
+import json
+import os
+import time
+
+from . import files
+from .cache import cache_dir
+from .exceptions import ConfigError
+from .fingerprint import RACY_SECONDS
+
+# Bump whenever the index changes, to ignore previously cached indexes
+INDEX_VERSION = 2
+
+
+def fragment_files(directory):
+    """
+    Return the path of every fragment within a directory, relative to it
+    """
+    found = []
+    for root, dirs, filenames in os.walk(directory):
+        dirs.sort()
+        found.extend(
+            os.path.relpath(os.path.join(root, filename), directory)
+            for filename in sorted(filenames) if filename.endswith('.json'))
+    return found
+
+
+def read_fragment(path):
+    """
+    Return the whole of a fragment, which must hold a stacks object
+    """
+    try:
+        with open(path) as fh:
+            fragment = json.load(fh)
+    except ValueError as err:
+        raise ConfigError(f'Error decoding {path}: {err}')
+    if not isinstance(fragment, dict) or not isinstance(
+            fragment.get('stacks'), dict):
+        raise ConfigError(f'{path} must hold a "stacks" object')
+    return fragment
+
+
+def index_path(directory):
+    key = hashlib.sha256(os.path.abspath(directory).encode('utf-8'))
+    return os.path.join(cache_dir('fragments'), f'{key.hexdigest()}.json')
+
+
+def index_stack(stack):
+    """
+    Return the template, and parameters file by parameters key, of a stack
+    """
+    return {
+        'template': stack.get('template'),
+        'parameters': {
+            key: params_file if isinstance(params_file, str) else None
+            for key, params_file in stack.get('parameters', {}).items()
+        },
+    }
+
+
+def compile_index(directory):
+    """
+    Return the index of a directory of fragments, mapping each fragment
+    to its mtime, size and the parameter keys and files of each stack it
+    defines, along with any fragments which had to be parsed to compile it
+
+    Only fragments which have changed since the index was cached are read.
+    """
+    path = index_path(directory)
+    try:
+        with open(path) as fh:
+            cached = json.load(fh)
+    except (OSError, ValueError):
+        cached = {}
+    if cached.get('version') != INDEX_VERSION:
+        cached = {}
+    previous = cached.get('fragments', {})
+
+    index = {}
+    parsed = {}
+    for filename in fragment_files(directory):
+        stat = os.stat(os.path.join(directory, filename))
+        entry = previous.get(filename)
+        if entry and (entry['mtime_ns'], entry['size']) == (stat.st_mtime_ns,
+                                                            stat.st_size):
+            index[filename] = entry
+            continue
+
+        fragment = read_fragment(os.path.join(directory, filename))
+        parsed[filename] = fragment['stacks']
+        index[filename] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'stacks': {
+                name: index_stack(stack)
+                for name, stack in fragment['stacks'].items()
+            },
+        }
+        # Fragments modified this recently may be modified again within
+        # the same mtime tick, so are parsed again next time
+        if time.time() - stat.st_mtime <= RACY_SECONDS:
+            index[filename]['mtime_ns'] = None
+
+    if index != previous:
+        try:
+            files.atomic_write(
+                path, json.dumps({
+                    'version': INDEX_VERSION,
+                    'fragments': index
+                }))
+        except OSError:
+            pass
+    return index, parsed
+
+
+class FragmentStacks(collections.abc.Mapping):
+    """
+    The stacks of stax.json and of every fragment in a directory, by name
+
+    Fragments are only parsed once one of their stacks is looked up, and
+    no stack may be defined more than once.
+    """
+    def __init__(self, stacks, directory):
+        self._own = stacks
+        self._directory = directory
+        self._index, self._loaded = compile_index(directory)
+
+        self._sources = {}
+        for filename, entry in self._index.items():
+            for name in entry['stacks']:
+                if name in self._own:
+                    other = files.CONFIG_FILE
+                else:
+                    other = self._sources.get(name)
+                if other:
+                    raise ConfigError(
+                        f'{name} is defined in both {other} and {filename}')
+                self._sources[name] = filename
+
+    def __getitem__(self, name):
+        if name in self._own:
+            return self._own[name]
+        return self.fragment(self._sources[name])[name]
+
+    def __iter__(self):
+        yield from self._own
+        yield from self._sources
+
+    def __len__(self):
+        return len(self._own) + len(self._sources)
+
+    def __contains__(self, name):
+        return name in self._own or name in self._sources
+
+    def fragment(self, filename):
+        """
+        Return the stacks of a fragment, parsing it on first use
+        """
+        if filename not in self._loaded:
+            self._loaded[filename] = read_fragment(
+                os.path.join(self._directory, filename))['stacks']
+        return self._loaded[filename]
+
+    def source(self, name):
+        """
+        Return the path of the fragment defining a stack, or None if it
+        is defined in stax.json
+        """
+        if name in self._sources:
+            return os.path.join(self._directory, self._sources[name])
+        return None
+
+    def parameter_keys(self):
+        """
+        Yield the (name, parameters key) pairs of every stack, without
+        parsing any fragments
+        """
+        for name, key, _, _ in self.stack_files():
+            yield name, key
+
+    def stack_files(self):
+        """
+        Yield the (name, parameters key, template, parameters file) of
+        every stack, without parsing any fragments
+        """
+        yield from stack_files(self._own)
+        for entry in self._index.values():
+            for name, stack in entry['stacks'].items():
+                for key, params_file in stack['parameters'].items():
+                    yield name, key, stack['template'], params_file
+
+    def write(self, stacks):
+        """
+        Write stacks back to the fragments defining them, leaving
+        unchanged fragments alone
+        """
+        by_fragment = collections.defaultdict(dict)
+        for name, stack in stacks.items():
+            by_fragment[self._sources[name]][name] = stack
+        for filename, changed in sorted(by_fragment.items()):
+            path = os.path.join(self._directory, filename)
+            fragment = read_fragment(path)
+            fragment['stacks'].update(changed)
+            files.write_if_changed(
+                path, json.dumps(fragment, sort_keys=True, indent=4))
+
+
+def parameter_keys(stacks):
+    """
+    Yield the (name, parameters key) pairs of every stack in a config's
+    stacks, parsing as few fragments as possible
+    """
+    if isinstance(stacks, FragmentStacks):
+        yield from stacks.parameter_keys()
+        return
+    for name, stack in stacks.items():
+        for key in stack['parameters']:
+            yield name, key
+
+
+def stack_files(stacks):
+    """
+    Yield the (name, parameters key, template, parameters file) of every
+    stack in a config's stacks, parsing as few fragments as possible,
+    where the parameters file is None if parameters are given inline
+    """
+    if isinstance(stacks, FragmentStacks):
+        yield from stacks.stack_files()
+        return
+    for name, stack in stacks.items():
+        indexed = index_stack(stack)
+        for key, params_file in indexed['parameters'].items():
+            yield name, key, indexed['template'], params_file
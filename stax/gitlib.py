@@ -2,41 +2,50 @@
 Git Helpers
 """
 
+import functools
 import os
 import shlex
 import subprocess
 
 import click
-import git
 
-try:
-    REPO = git.Repo(os.getcwd(), search_parent_directories=True)
-except git.exc.InvalidGitRepositoryError:
-    click.secho('Error! Please run stax inside a git managed path',
-                fg='red',
-                err=True)
-    exit(1)
+
+@functools.lru_cache(maxsize=None)
+def repo():
+    """
+    Return the git repository, which is only opened once it is needed
+    as GitPython is slow to import
+    """
+    import git
+
+    try:
+        return git.Repo(os.getcwd(), search_parent_directories=True)
+    except git.exc.InvalidGitRepositoryError:
+        click.secho('Error! Please run stax inside a git managed path',
+                    fg='red',
+                    err=True)
+        exit(1)
 
 
 def current_branch():
     """
     Return the current branch
     """
-    return f'{REPO.active_branch}'
+    return f'{repo().active_branch}'
 
 
 def remotes():
     """
     Return a comma separated string of remotes
     """
-    return ','.join([url for remote in REPO.remotes for url in remote.urls])
+    return ','.join([url for remote in repo().remotes for url in remote.urls])
 
 
-def lookup_sha(revision=REPO.active_branch):
+def lookup_sha(revision=None):
     """
     Return the current branch
     """
-    return REPO.git.rev_parse(REPO.active_branch, short=True)
+    return repo().git.rev_parse(repo().active_branch, short=True)
 
 
 def commits_between_old(rev1, rev2='origin/master'):
@@ -53,25 +62,38 @@ def commits_between(rev1, rev2='origin/master'):
     Return the number of commits between two references
     Optionally return just the count
     """
-    return len([REPO.iter_commits(f'{rev1}..{rev2}')])
+    return len([repo().iter_commits(f'{rev1}..{rev2}')])
 
 
 def user_email():
     """
     Return the git user
     """
-    return REPO.config_reader().get_value('user', 'email')
+    return repo().config_reader().get_value('user', 'email')
 
 
 def file_contents(filename, revision):
     """
-    Return the contents of a file from a specific revision
+    Return the contents of a file from a specific revision,
+    or None if it didn't exist then
     """
-    return REPO.git.show(f'{revision}:{filename}')
+    import git
+
+    try:
+        return repo().git.show(f'{revision}:{filename}')
+    except git.exc.GitCommandError:
+        return None
 
 
 def changed_files(revision="HEAD^1"):
     """
     Return changed files since the last commit
     """
-    return REPO.git.diff(f'{revision}', name_only=True).split('\n')
+    return repo().git.diff(f'{revision}', name_only=True).split('\n')
+
+
+def working_dir():
+    """
+    Return the root of the git working tree
+    """
+    return repo().working_tree_dir
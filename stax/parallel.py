@@ -0,0 +1,154 @@
+"""
+Run stack operations concurrently
+"""
+import collections
+import concurrent.futures
+import threading
+
+import click
+from click.globals import pop_context, push_context
+
+from .exceptions import DependencyFailed
+
+Result = collections.namedtuple('Result', ['item', 'value', 'error'])
+
+_LOCAL = threading.local()
+
+
+class InlineExecutor(concurrent.futures.Executor):
+    """
+    An executor which runs everything submitted to it straight away,
+    on the submitting thread
+    """
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as err:
+            future.set_exception(err)
+        return future
+
+
+def in_worker():
+    """
+    Determine if we are running inside a run_parallel worker thread
+    """
+    return getattr(_LOCAL, 'active', False)
+
+
+def run_parallel(items,
+                 func,
+                 concurrency=1,
+                 limits=None,
+                 requires=None,
+                 succeeded=None):
+    """
+    Call func for every item on a pool of worker threads
+
+    limits is a list of (key_func, cap) pairs, which stop more than
+    cap items sharing the same key_func(item) from running at once,
+    eg. to cap the number of stacks being changed per account.
+
+    requires returns the items an item must wait for, eg. the stacks
+    whose exports it imports. Each item starts as soon as everything
+    it requires has succeeded, which is when it raised nothing and
+    succeeded(value) is true. Items requiring a failed item are never
+    run, and their Result has a DependencyFailed error.
+
+    A Result is returned for every item, in the order given, and a
+    failing item never stops those not requiring it from running.
+
+    Called from within a worker, items are run one at a time on that
+    worker's thread instead, so nested calls never multiply the threads.
+    """
+    items = list(items)
+    limits = [(key_func, cap) for key_func, cap in (limits or []) if cap]
+    concurrency = max(concurrency, 1)
+
+    # Worker threads don't inherit the click context, so hand it over
+    ctx = click.get_current_context(silent=True)
+
+    def call(item):
+        active = in_worker()
+        _LOCAL.active = True
+        if ctx:
+            push_context(ctx)
+        try:
+            return func(item)
+        finally:
+            if ctx:
+                pop_context()
+            _LOCAL.active = active
+
+    def keys(item):
+        return [(i, key_func(item)) for i, (key_func, _) in enumerate(limits)]
+
+    # Indexes of the items each item requires, ignoring any not given
+    positions = {id(item): index for index, item in enumerate(items)}
+    required = [{
+        positions[id(other)]
+        for other in (requires(item) if requires else ())
+        if id(other) in positions
+    } for item in items]
+
+    running = collections.Counter()
+    results = [None] * len(items)
+    failed = set()
+    pending = list(range(len(items)))
+    futures = {}
+
+    if in_worker():
+        concurrency = 1
+        executor = InlineExecutor()
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=concurrency)
+
+    with executor as pool:
+        while pending or futures:
+            waiting = []
+            for index in pending:
+                item_keys = keys(items[index])
+                if required[index] & failed:
+                    upstream = items[min(required[index] & failed)]
+                    results[index] = Result(
+                        items[index], None,
+                        DependencyFailed(f'skipped, as {upstream} failed'))
+                    failed.add(index)
+                elif any(results[other] is None for other in required[index]):
+                    waiting.append(index)
+                elif len(futures) < concurrency and all(
+                        running[key] < limits[key[0]][1] for key in item_keys):
+                    running.update(item_keys)
+                    futures[pool.submit(call, items[index])] = index
+                else:
+                    waiting.append(index)
+
+            if not futures:
+                # Nothing left to finish first, so what's left is a cycle,
+                # unless more items were only just skipped
+                if waiting == pending:
+                    for index in waiting:
+                        results[index] = Result(
+                            items[index], None,
+                            DependencyFailed('skipped, as its dependencies '
+                                             'form a cycle'))
+                    waiting = []
+                pending = waiting
+                continue
+            pending = waiting
+
+            done, _ = concurrent.futures.wait(
+                futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index = futures.pop(future)
+                running.subtract(keys(items[index]))
+                try:
+                    results[index] = Result(items[index], future.result(),
+                                            None)
+                except Exception as err:
+                    results[index] = Result(items[index], None, err)
+                if results[index].error or (
+                        succeeded and not succeeded(results[index].value)):
+                    failed.add(index)
+    return results
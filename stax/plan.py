@@ -0,0 +1,195 @@
+"""
+Plan changes to stacks, to be reviewed and applied later
+
+A plan file records the changeset created for each stack, along with
+the STAX_HASH of the local stack and of the live stack when planned, so
+that apply can refuse to execute anything which has since changed.
+"""
+import json
+
+import botocore.exceptions
+import click
+
+from . import profiling
+from .aws.changesets import Change, iter_changes
+from .aws.cloudformation import (FAILURE_STATES, Cloudformation,
+                                 parse_changeset_changes, spinner)
+from .aws.connection_manager import prewarm
+from .exceptions import PlanError, StackNotFound
+from .parallel import run_parallel
+
+PLAN_VERSION = 1
+
+
+def pending_stacks(ctx, found_stacks, compare_hashes, concurrency):
+    """
+    Return the stacks which may need changing, which is every stack
+    unless compare_hashes, when only stacks whose STAX_HASH tag differs
+    from their local hash are returned
+
+    Purged stacks are only returned if they still exist.
+    """
+    pending = []
+    with profiling.span('plan'):
+        # Describe every account/region we compare STAX_HASH tags for up front
+        if compare_hashes:
+            snapshots = {(stack.account, stack.region)
+                         for stack in found_stacks if not stack.purge}
+            with spinner(text='Fetching stack status'):
+                prewarm(
+                    Cloudformation(account=account,
+                                   region=region).client_keys[0]
+                    for account, region in snapshots)
+                run_parallel(sorted(snapshots),
+                             lambda key: Cloudformation(
+                                 account=key[0], region=key[1]).snapshot,
+                             concurrency=concurrency)
+
+        for stack in found_stacks:
+            ctx.obj.debug(
+                f'Found {stack.name} in region {stack.region} with account number {stack.account_id}'
+            )
+
+            # If we have a small number of stacks, it's faster to just create changesets
+            if not compare_hashes or stack.purge:
+                if stack.purge:
+                    ctx.obj.debug(
+                        f'Checking to see if {stack.name} still exists')
+                    if not stack.exists:
+                        continue
+                pending.append(stack)
+            # Use the described stacks and compare STAX_HASH tag
+            elif stack.pending_update(stack.remote_stax_hash):
+                pending.append(stack)
+    return pending
+
+
+def report(results):
+    """
+    Report the outcome of each stack pushed or applied in parallel
+    """
+    failures = 0
+    click.echo()
+    for result in sorted(results, key=lambda x: repr(x.item)):
+        if result.error:
+            failures += 1
+            click.secho(f'{result.item}: {result.error}', fg='red')
+        elif result.value in FAILURE_STATES:
+            failures += 1
+            click.secho(f'{result.item}: {result.value}', fg='red')
+        elif result.value:
+            click.secho(f'{result.item}: {result.value}', fg='green')
+        else:
+            click.echo(f'{result.item}: no changes executed')
+    return failures
+
+
+def plan_stack(stack, use_existing_params, skip_tags):
+    """
+    Create a changeset for a stack, or plan its deletion if purged
+
+    Returns the stack's plan entry, or None if it has no changes
+    """
+    entry = {
+        'account': stack.account,
+        'region': stack.region,
+        'name': stack.name,
+        'remote_stax_hash': stack.remote_stax_hash,
+        'changeset_id': None,
+        'changes': [],
+    }
+    if stack.purge:
+        return dict(entry, action='DELETE', stax_hash=None)
+
+    entry['stax_hash'] = stack.hash_of_params_and_template
+    try:
+        entry['action'] = 'UPDATE'
+        changeset = stack.changeset_create_and_wait(
+            'UPDATE',
+            use_existing_params=use_existing_params,
+            skip_tags=skip_tags)
+    except StackNotFound:
+        entry['action'] = 'CREATE'
+        changeset = stack.changeset_create_and_wait('CREATE')
+    if not changeset:
+        return None
+
+    entry['changeset_id'] = changeset['ChangeSetId']
+    entry['changes'] = [
+        change._asdict() for change in iter_changes(stack.client, changeset)
+    ]
+    return entry
+
+
+def show_entry(entry):
+    """
+    Echo what applying a plan entry will change
+    """
+    colour = {'CREATE': 'green', 'UPDATE': 'cyan', 'DELETE': 'red'}
+    click.secho(
+        f'\n{entry["account"]}/{entry["region"]}/{entry["name"]}: '
+        f'{entry["action"].lower()}',
+        fg=colour[entry['action']],
+        bold=True)
+    parse_changeset_changes(Change(**change) for change in entry['changes'])
+
+
+def write_plan(fh, entries):
+    plan = {'version': PLAN_VERSION, 'stacks': entries}
+    json.dump(plan, fh, indent=4, sort_keys=True)
+    fh.write('\n')
+
+
+def read_plan(fh):
+    """
+    Return the entries of a plan file
+    """
+    try:
+        plan = json.load(fh)
+    except ValueError as err:
+        raise PlanError(f'{fh.name} is not a plan file: {err}')
+    if not isinstance(plan, dict) or plan.get('version') != PLAN_VERSION:
+        raise PlanError(
+            f'{fh.name} is not a version {PLAN_VERSION} plan file, '
+            'run stax plan again')
+    return plan['stacks']
+
+
+def verify_entry(stack, entry):
+    """
+    Raise PlanError if a stack has changed locally or in AWS since it
+    was planned, or its changeset can no longer be executed
+    """
+    if stack.purge != (entry['action'] == 'DELETE'):
+        raise PlanError('purge has changed since planning')
+    if not stack.purge and stack.hash_of_params_and_template != entry[
+            'stax_hash']:
+        raise PlanError('template or parameters changed since planning')
+    if entry['action'] == 'CREATE':
+        # Creating the changeset made a stack to review, tagged with the
+        # new STAX_HASH, which is fine so long as nothing else created it
+        status = (stack.remote or {}).get('StackStatus')
+        if status not in (None, 'REVIEW_IN_PROGRESS'):
+            raise PlanError('the live stack changed since planning')
+    elif stack.remote_stax_hash != entry['remote_stax_hash']:
+        raise PlanError('the live stack changed since planning')
+    if stack.purge:
+        return
+
+    try:
+        changeset = stack.client.describe_change_set(
+            ChangeSetName=entry['changeset_id'])
+    except botocore.exceptions.ClientError as err:
+        raise PlanError(err.response['Error']['Message'])
+    if changeset['ExecutionStatus'] != 'AVAILABLE':
+        raise PlanError(
+            f'changeset is {changeset["ExecutionStatus"]}, plan again')
+
+
+def apply_entry(stack, entry):
+    """
+    Execute a planned change, returning the final stack status
+    """
+    if entry['action'] == 'DELETE':
+        return stack.delete_and_wait()
+    return stack.execute_changeset(entry['changeset_id'])
@@ -0,0 +1,193 @@
+"""
+Time stax's phases and AWS API calls, when asked to with --profile
+
+Nothing is recorded unless profiling is enabled, and spans cost no more
+than a function call while it isn't.
+"""
+import collections
+import contextlib
+import functools
+import json
+import threading
+import time
+
+import click
+
+ENABLED = False
+TRACE_FILE = None
+
+# Span = what was timed, with its start and duration in seconds
+Span = collections.namedtuple(
+    'Span', ['name', 'category', 'start', 'duration', 'thread', 'args'])
+
+_SPANS = []
+_LOCK = threading.Lock()
+_STARTED = time.perf_counter()
+_DISABLED = contextlib.nullcontext()
+
+
+def enable(trace_file=None):
+    """
+    Start recording, optionally to write a Chrome trace when done
+    """
+    global ENABLED, TRACE_FILE
+    ENABLED = True
+    TRACE_FILE = trace_file
+
+
+def record(name, category, start, duration, **args):
+    with _LOCK:
+        _SPANS.append(
+            Span(name, category, start, duration, threading.get_ident(), args))
+
+
+@contextlib.contextmanager
+def _span(name, category, args):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, category, start, time.perf_counter() - start, **args)
+
+
+def span(name, category='stax', **args):
+    """
+    Time a block of code, eg. with span('set_stacks'):
+    """
+    if not ENABLED:
+        return _DISABLED
+    return _span(name, category, args)
+
+
+def timed(name, category='stax', method=False):
+    """
+    Decorate a function to time each call, recording which object
+    each call was for if it is a method
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with _span(name, category,
+                       {'target': repr(args[0])} if method else {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def sleep(seconds, reason, service, profile, region):
+    """
+    Sleep, recording the time spent waiting on AWS rate limits
+    """
+    if seconds <= 0:
+        return
+    if ENABLED:
+        record(reason,
+               'throttle',
+               time.perf_counter(),
+               seconds,
+               service=service,
+               profile=profile,
+               region=region)
+    time.sleep(seconds)
+
+
+def install(client, profile, region, service):
+    """
+    Time every API call made by a client, from building its request,
+    so that any wait on rate limits is included
+    """
+    if not ENABLED:
+        return
+    event_name = client.meta.service_model.service_id.hyphenize()
+
+    def before_build(context, **kwargs):
+        context['stax_started'] = time.perf_counter()
+
+    def after_call(model, context, http_response=None, **kwargs):
+        start = context.pop('stax_started', None)
+        if start is None:
+            return
+        record(model.name,
+               'api',
+               start,
+               time.perf_counter() - start,
+               service=service,
+               profile=profile,
+               region=region,
+               status=getattr(http_response, 'status_code', None))
+
+    client.meta.events.register(f'before-parameter-build.{event_name}',
+                                before_build,
+                                unique_id='stax-profile-before-build')
+    client.meta.events.register(f'after-call.{event_name}',
+                                after_call,
+                                unique_id='stax-profile-after-call')
+
+
+def summary():
+    """
+    Return rows of (category, name, count, total seconds), slowest first,
+    with API calls grouped by service, operation, profile and region
+    """
+    totals = collections.defaultdict(lambda: [0, 0.0])
+    with _LOCK:
+        spans = list(_SPANS)
+    for span in spans:
+        if span.category in ('api', 'throttle'):
+            name = (f'{span.args["service"]}.{span.name} '
+                    f'{span.args["profile"]}/{span.args["region"]}')
+        else:
+            name = span.name
+        totals[(span.category, name)][0] += 1
+        totals[(span.category, name)][1] += span.duration
+    return sorted(((category, name, count, total)
+                   for (category, name), (count, total) in totals.items()),
+                  key=lambda row: row[3],
+                  reverse=True)
+
+
+def report():
+    """
+    Print a summary table, and write the Chrome trace if asked to
+    """
+    if not ENABLED:
+        return
+
+    click.echo(
+        f'\n{"category":<10}{"name":<60}{"calls":>7}{"total ms":>11}'
+        f'{"mean ms":>10}',
+        err=True)
+    for category, name, count, total in summary():
+        click.echo(
+            f'{category:<10}{name:<60}{count:>7}{total * 1000:>11.1f}'
+            f'{total * 1000 / count:>10.1f}',
+            err=True)
+
+    if TRACE_FILE:
+        with open(TRACE_FILE, 'w') as fh:
+            json.dump(trace_events(), fh)
+        click.echo(f'Wrote trace to {TRACE_FILE}', err=True)
+
+
+def trace_events():
+    """
+    Return every span in Chrome's trace event format
+    """
+    with _LOCK:
+        spans = list(_SPANS)
+    return {
+        'traceEvents': [{
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': (span.start - _STARTED) * 1e6,
+            'dur': span.duration * 1e6,
+            'pid': 1,
+            'tid': span.thread,
+            'args': span.args,
+        } for span in spans]
+    }
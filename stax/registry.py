@@ -0,0 +1,148 @@
+"""
+Index the stacks defined in stax.json
+"""
+import bisect
+import collections
+import fnmatch
+
+from .fragments import parameter_keys
+
+GLOB_CHARS = '*?['
+
+# key is the stack's key within its parameters, eg. us-east-1/prod
+Entry = collections.namedtuple('Entry', ['name', 'account', 'region', 'key'])
+
+
+class StackRegistry:
+    """
+    Every stack defined in stax.json, indexed by account, region and name
+
+    Stack objects are only built for the stacks a search matches, so
+    picking a few stacks out of a large stax.json stays cheap, and only
+    the stax.d fragments defining them are parsed.
+    """
+    INDEXED = ('account', 'region', 'name')
+
+    def __init__(self, config, only=None):
+        """
+        Index config's stacks, or only the (name, parameters key) pairs
+        in only when given
+        """
+        self.default_bucket = config.get('default_bucket')
+        self._definitions = config['stacks']
+        self._entries = []
+        self._stacks = {}
+        self._indexes = {
+            attr: collections.defaultdict(list)
+            for attr in self.INDEXED
+        }
+
+        for name, region_and_account in parameter_keys(config['stacks']):
+            if only is not None and (name, region_and_account) not in only:
+                continue
+            try:
+                region, account = region_and_account.split('/')
+            except ValueError:
+                account = region_and_account
+                region = config['default_region']
+
+            entry = Entry(name, account, region, region_and_account)
+            for attr in self.INDEXED:
+                self._indexes[attr][getattr(entry,
+                                            attr)].append(len(self._entries))
+            self._entries.append(entry)
+
+        self._names = sorted(self._indexes['name'])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return (self.stack(index) for index in range(len(self._entries)))
+
+    def stack(self, index):
+        """
+        Return the Stack for an entry, building it on first use
+        """
+        if index not in self._stacks:
+            from .aws.cloudformation import Stack
+
+            entry = self._entries[index]
+            definition = self._definitions[entry.name]
+            params = definition['parameters'][entry.key]
+            self._stacks[index] = Stack(
+                name=entry.name,
+                account=entry.account,
+                region=entry.region,
+                params=params if params else None,
+                template_file=definition['template'],
+                tags=definition.get('tags', {}),
+                bucket=definition.get('bucket', self.default_bucket),
+                purge=definition.get('purge', False),
+                depends_on=definition.get('depends_on', ()))
+        return self._stacks[index]
+
+    def match_names(self, pattern):
+        """
+        Return the entries whose name is pattern, or matches it as a glob
+        """
+        names = self._indexes['name']
+        if not any(char in pattern for char in GLOB_CHARS):
+            return names.get(pattern, [])
+
+        # Only names sharing the glob's literal prefix can match it
+        prefix = pattern[:min(
+            pattern.find(char) for char in GLOB_CHARS if char in pattern)]
+        found = []
+        for name in self._names[bisect.bisect_left(self._names, prefix):]:
+            if not name.startswith(prefix):
+                break
+            if fnmatch.fnmatchcase(name, pattern):
+                found.extend(names[name])
+        return found
+
+    def lookup(self, attr, value):
+        """
+        Return the entries whose attr matches value
+        """
+        if attr == 'name':
+            return self.match_names(value)
+        return self._indexes[attr].get(value, [])
+
+    def search(self, **filters):
+        """
+        Return the stacks matching every filter, in stax.json order
+
+        Like class_filter, each filter is either a single value or a
+        collection of values, and empty filters are ignored.
+        """
+        found = None
+        unindexed = {}
+        for attr, values in filters.items():
+            if not values:
+                continue
+            if attr not in self._indexes:
+                unindexed[attr] = values
+                continue
+            if isinstance(values, str):
+                values = [values]
+            # Skip filters which match everything, eg. the default accounts
+            if attr != 'name' and set(values) >= self._indexes[attr].keys():
+                continue
+
+            matches = set()
+            for value in values:
+                matches.update(self.lookup(attr, value))
+            found = matches if found is None else found & matches
+
+        if found is None:
+            found = range(len(self._entries))
+        stacks = [self.stack(index) for index in sorted(found)]
+
+        for attr, values in unindexed.items():
+            if isinstance(values, str):
+                values = [values]
+            stacks = [
+                stack for stack in stacks if getattr(stack, attr) in values
+            ]
+        return stacks
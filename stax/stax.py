@@ -9,7 +9,8 @@ import sys
 
 import click
 
-from stax import __version__
+from stax import __version__, files, profiling
+from stax.exceptions import ConfigError
 
 
 class Context:
@@ -31,8 +32,17 @@ class Context:
 
     def get_config(self):
         try:
-            with open('stax.json', 'r') as fh:
-                return json.load(fh)
+            with open(files.CONFIG_FILE, 'r') as fh:
+                config = json.load(fh)
+            if os.path.isdir(files.CONFIG_DIR):
+                from stax.fragments import FragmentStacks
+
+                config['stacks'] = FragmentStacks(config.get('stacks', {}),
+                                                  files.CONFIG_DIR)
+            return config
+        except ConfigError as err:
+            click.echo(str(err), err=True)
+            sys.exit(1)
         except json.decoder.JSONDecodeError as err:
             click.echo(click.style('Error decoding stacks.json: ', bold=True) +
                        str(err),
@@ -48,6 +58,26 @@ class Context:
         if self._debug:
             click.echo(f'debug: {msg}', err=True)
 
+    def close(self):
+        """
+        Save new file fingerprints, and report how often AWS rate
+        limits were hit, if either were used at all, and where time
+        was spent if profiling
+        """
+        fingerprint = sys.modules.get('stax.fingerprint')
+        if fingerprint:
+            fingerprint.FINGERPRINTS.save()
+
+        rate_limiter = sys.modules.get('stax.aws.rate_limiter')
+        if self._debug and rate_limiter:
+            for (profile, region, service,
+                 reason), count in rate_limiter.limit_hits().most_common():
+                self.debug(
+                    f'{service} in {profile}/{region} hit {reason} {count} times'
+                )
+
+        profiling.report()
+
 
 # Retrieve root commands from this path
 cmd_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'commands'))
@@ -87,12 +117,21 @@ class CLI(click.MultiCommand):
 @click.command(cls=CLI)
 @click.version_option(version=__version__)
 @click.option("--debug", is_flag=True)
+@click.option("--profile",
+              is_flag=True,
+              help='Time AWS API calls and each phase, printing a summary')
+@click.option("--trace",
+              type=click.Path(dir_okay=False),
+              help='Profile, and write a Chrome trace to this file')
 @click.pass_context
-def cli(ctx, debug):
+def cli(ctx, debug, profile, trace):
     """
     Pystacks - Manage your Cloudformation Stacks
     """
+    if profile or trace:
+        profiling.enable(trace_file=trace)
     ctx.obj = Context(debug)
+    ctx.call_on_close(ctx.obj.close)
 
 
 if __name__ == "__main__":
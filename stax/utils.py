@@ -1,10 +1,15 @@
 import collections
+import json
 import os
+import string
 import sys
 
 import click
 
-from .aws.cloudformation import DEFAULT_AWS_REGIONS, Stack
+from . import files, gitlib, profiling
+from .aws.regions import DEFAULT_AWS_REGIONS
+from .fragments import stack_files
+from .registry import StackRegistry
 
 
 def default_accounts(ctx, param, value):
@@ -32,6 +37,10 @@ def class_filter(instances, **filters):
     """
     Search for class instances by their attributes
     """
+    if isinstance(instances, StackRegistry):
+        found_instances = instances.search(**filters)
+        return len(found_instances), found_instances
+
     found_instances = []
     for instance in instances:
         for filter_key, filter_value in filters.items():
@@ -73,26 +82,77 @@ def accounts_regions_and_names(func):
     return func
 
 
-def set_stacks(ctx):
-    ctx.obj.stacks = []
-
-    for name, stack in ctx.obj.config['stacks'].items():
-        for region_and_account, params_file in stack['parameters'].items():
-            try:
-                region, account = region_and_account.split('/')
-            except ValueError:
-                account = region_and_account
-                region = ctx.obj.config['default_region']
-            ctx.obj.stacks.append(
-                Stack(name=name,
-                      account=account,
-                      region=region,
-                      params=params_file if params_file else None,
-                      template_file=stack['template'],
-                      tags=stack.get('tags', {}),
-                      bucket=stack.get('bucket',
-                                       ctx.obj.config.get('default_bucket')),
-                      purge=stack.get('purge', False)))
+def changed_stacks(config, revision):
+    """
+    Return the (name, parameters key) pairs of stacks whose template,
+    parameters file or stax.json entry have changed since a git revision
+
+    Stacks defined in a stax.d fragment are compared against the fragment
+    at the revision, and only fragments git reports as changed are parsed.
+    """
+    root = gitlib.working_dir()
+    changed_files = {
+        os.path.realpath(os.path.join(root, filename))
+        for filename in gitlib.changed_files(revision) if filename
+    }
+
+    def old_definitions(filename):
+        contents = gitlib.file_contents(
+            os.path.relpath(os.path.realpath(filename), root), revision)
+        try:
+            definitions = json.loads(contents).get('stacks', {})
+        except (TypeError, ValueError, AttributeError):
+            return {}
+        return definitions if isinstance(definitions, dict) else {}
+
+    old_stacks = old_definitions(files.CONFIG_FILE)
+    old_fragments = {}
+
+    def is_changed(filename, name, account):
+        filename = string.Template(filename).substitute(name=name,
+                                                        account=account)
+        return os.path.realpath(filename) in changed_files
+
+    stacks = config['stacks']
+    source = getattr(stacks, 'source', lambda name: None)
+
+    entries_changed = {}
+
+    def entry_changed(name):
+        if name not in entries_changed:
+            fragment = source(name)
+            if not fragment:
+                old = old_stacks.get(name)
+            elif os.path.realpath(fragment) not in changed_files:
+                entries_changed[name] = False
+                return False
+            else:
+                if fragment not in old_fragments:
+                    old_fragments[fragment] = old_definitions(fragment)
+                # Stacks moved out of stax.json unchanged haven't changed
+                old = old_fragments[fragment].get(name, old_stacks.get(name))
+            entries_changed[name] = old != stacks[name]
+        return entries_changed[name]
+
+    found = set()
+    for name, region_and_account, template, params_file in stack_files(stacks):
+        account = region_and_account.split('/')[-1]
+        if entry_changed(name) or is_changed(template, name, account) or (
+                params_file and is_changed(params_file, name, account)):
+            found.add((name, region_and_account))
+    return found
+
+
+def set_stacks(ctx, changed_since=None):
+    """
+    Load the stacks defined in stax.json, optionally only those
+    changed since a git revision
+    """
+    with profiling.span('set_stacks'):
+        only = None
+        if changed_since:
+            only = changed_stacks(ctx.obj.config, changed_since)
+        ctx.obj.stacks = StackRegistry(ctx.obj.config, only=only)
 
 
 def plural(count, singular, plural=None):
@@ -0,0 +1,66 @@
+import boto3
+from botocore.stub import Stubber
+
+from stax.aws.changesets import Change, iter_changes
+
+
+def resource_change(logical_id, action='Modify'):
+    return {
+        'Type': 'Resource',
+        'ResourceChange': {
+            'Action':
+            action,
+            'LogicalResourceId':
+            logical_id,
+            'ResourceType':
+            'AWS::SNS::Topic',
+            'Replacement':
+            'False',
+            'Scope': ['Properties', 'Tags'],
+            'Details': [{
+                'Target': {
+                    'Attribute': 'Properties',
+                    'Name': 'TopicName'
+                },
+                'CausingEntity': 'Name'
+            }, {
+                'Target': {
+                    'Attribute': 'Tags'
+                }
+            }],
+        }
+    }
+
+
+def test_iter_changes_follows_pages():
+    client = boto3.client('cloudformation',
+                          region_name='ap-southeast-2',
+                          aws_access_key_id='test',
+                          aws_secret_access_key='test')
+    stubber = Stubber(client)
+    stubber.add_response('describe_change_set', {
+        'Changes': [resource_change('Two', action='Add')],
+    }, {
+        'ChangeSetName': 'changeset-id',
+        'NextToken': 'page-2'
+    })
+    changeset = {
+        'ChangeSetId': 'changeset-id',
+        'Changes': [resource_change('One')],
+        'NextToken': 'page-2'
+    }
+
+    with stubber:
+        changes = list(iter_changes(client, changeset))
+        stubber.assert_no_pending_responses()
+
+    assert changes[0] == Change(action='Modify',
+                                logical_id='One',
+                                physical_id=None,
+                                resource_type='AWS::SNS::Topic',
+                                replacement=False,
+                                causes={
+                                    'Properties': ['Name'],
+                                    'Tags': []
+                                })
+    assert [change.logical_id for change in changes] == ['One', 'Two']
@@ -0,0 +1,45 @@
+from stax.aws import connection_manager
+
+
+def test_sessions_share_one_loader(tmp_path, monkeypatch):
+    config = tmp_path / 'config'
+    config.write_text('[profile a]\n[profile b]\n')
+    monkeypatch.setenv('AWS_CONFIG_FILE', str(config))
+    monkeypatch.setenv('STAX_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setenv('STAX_CREDENTIAL_CACHE', '1')
+    monkeypatch.setattr(connection_manager, '_LOADER', None)
+    monkeypatch.setattr(connection_manager, '_SESSIONS', {})
+
+    first = connection_manager.new_session('a')
+    second = connection_manager.new_session('b')
+    loader = first._session.get_component('data_loader')
+    assert second._session.get_component('data_loader') is loader
+    assert len(loader.search_paths) == len(set(loader.search_paths))
+
+    # Assumed role credentials are cached within the stax cache
+    provider = second._session.get_component(
+        'credential_provider').get_provider('assume-role')
+    provider.cache['role'] = {'Credentials': {}}
+    assert (tmp_path / 'cache' / 'credentials' / 'role.json').exists()
+
+
+def test_clients_are_cached_by_service(tmp_path, monkeypatch):
+    config = tmp_path / 'config'
+    config.write_text('[profile a]\n')
+    monkeypatch.setenv('AWS_CONFIG_FILE', str(config))
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    monkeypatch.setattr(connection_manager, '_CLIENTS', {})
+    monkeypatch.setattr(connection_manager, '_SESSIONS', {})
+
+    cloudformation = connection_manager.get_client('a', 'ap-southeast-2',
+                                                   'cloudformation')
+    s3 = connection_manager.get_client('a', 'ap-southeast-2', 's3')
+    assert cloudformation is not s3
+    assert cloudformation.meta.service_model.service_name == 'cloudformation'
+    assert s3.meta.service_model.service_name == 's3'
+
+    assert connection_manager.get_client('a', 'ap-southeast-2',
+                                         'cloudformation') is cloudformation
+    assert connection_manager.get_client('a', 'ap-southeast-2', 's3') is s3
+    assert connection_manager.get_client('a', 'us-east-1', 's3') is not s3
@@ -0,0 +1,156 @@
+import json
+
+import click
+import pytest
+
+from stax import dag
+from stax.aws.cloudformation import Stack
+from stax.exceptions import DependencyCycle, DependencyFailed
+from stax.parallel import run_parallel
+from stax.stax import Context, cli
+
+
+def make_stack(name, outputs=None, resources=None, **kwargs):
+    template = {
+        'Parameters': {
+            'Env': {
+                'Type': 'String',
+                'Default': 'dev'
+            }
+        },
+        'Resources': resources or {},
+        'Outputs': outputs or {},
+    }
+    return Stack(name=name,
+                 account='dev',
+                 region='ap-southeast-2',
+                 template_body=json.dumps(template),
+                 **kwargs)
+
+
+def imports(value):
+    return {
+        'Topic': {
+            'Type': 'AWS::SNS::Subscription',
+            'Properties': {
+                'TopicArn': {
+                    'Fn::ImportValue': value
+                }
+            }
+        }
+    }
+
+
+@pytest.fixture
+def context():
+    obj = Context(False)
+    obj._config = {'accounts': {'dev': {'id': '123', 'profile': 'dev'}}}
+    with click.Context(cli, obj=obj) as ctx:
+        yield ctx
+
+
+def test_resolve():
+    variables = {'AWS::StackName': 'vpc', 'AWS::Region': 'ap-southeast-2'}
+    assert dag.resolve('vpc-id', variables) == 'vpc-id'
+    assert dag.resolve({'Fn::Sub': '${AWS::StackName}-id'},
+                       variables) == 'vpc-id'
+    assert dag.resolve(
+        {'Fn::Sub': ['${Name}-${!Literal}', {
+            'Name': {
+                'Ref': 'AWS::Region'
+            }
+        }]}, variables) == 'ap-southeast-2-${Literal}'
+    assert dag.resolve({'Fn::Join': ['-', [{
+        'Ref': 'AWS::StackName'
+    }, 'id']]}, variables) == 'vpc-id'
+    assert dag.resolve({'Fn::Sub': '${Unknown}-id'}, variables) is None
+    assert dag.resolve({'Fn::GetAtt': ['Vpc', 'Id']}, variables) is None
+
+
+def test_resolve_ignores_malformed_functions():
+    variables = {'A': 'a'}
+    assert dag.resolve({'Fn::Sub': ['x-${A}', ['bad']]}, variables) is None
+    assert dag.resolve({'Fn::Sub': ['x-${A}']}, variables) is None
+    assert dag.resolve({'Ref': ['A']}, variables) is None
+    assert dag.resolve({'Fn::Join': ['-', 'bad']}, variables) is None
+
+
+def test_numeric_defaults_are_substituted(context):
+    template = {
+        'Parameters': {
+            'Port': {
+                'Type': 'Number',
+                'Default': 8080
+            }
+        },
+        'Resources': {},
+        'Outputs': {
+            'Port': {
+                'Value': 'x',
+                'Export': {
+                    'Name': {
+                        'Fn::Sub': '${AWS::StackName}-${Port}'
+                    }
+                }
+            }
+        },
+    }
+    stack = Stack(name='lb',
+                  account='dev',
+                  region='ap-southeast-2',
+                  template_body=json.dumps(template))
+    assert dag.exports(stack) == {'lb-8080'}
+
+
+def test_build_graph_and_waves(context):
+    vpc = make_stack('vpc',
+                     outputs={
+                         'Id': {
+                             'Value': 'vpc-1',
+                             'Export': {
+                                 'Name': {
+                                     'Fn::Sub': '${AWS::StackName}-${Env}'
+                                 }
+                             }
+                         }
+                     })
+    app = make_stack('app', resources=imports('vpc-dev'))
+    web = make_stack('web', depends_on=['app', 'elsewhere'])
+    other = make_stack('other', resources=imports('not-pushed'))
+
+    graph = dag.build_graph([web, app, vpc, other])
+    assert graph == {web: {app}, app: {vpc}, vpc: set(), other: set()}
+    assert dag.waves(graph) == [[vpc, other], [app], [web]]
+
+    path, total = dag.critical_path(graph, {vpc: 2, app: 3, web: 1, other: 5})
+    assert path == [vpc, app, web]
+    assert total == 6
+
+
+def test_waves_detects_cycles(context):
+    one = make_stack('one', depends_on=['two'])
+    two = make_stack('two', depends_on=['one'])
+    with pytest.raises(DependencyCycle):
+        dag.waves(dag.build_graph([one, two]))
+
+
+def test_run_parallel_skips_dependents_of_failures():
+    requires = {'vpc': [], 'app': ['vpc'], 'web': ['app'], 'db': []}
+    items = list(requires)
+    started = []
+
+    def func(item):
+        started.append(item)
+        return 'ROLLBACK_COMPLETE' if item == 'vpc' else 'UPDATE_COMPLETE'
+
+    results = run_parallel(
+        items,
+        func,
+        concurrency=4,
+        requires=lambda item: requires[item],
+        succeeded=lambda status: status != 'ROLLBACK_COMPLETE')
+
+    assert sorted(started) == ['db', 'vpc']
+    assert isinstance(results[1].error, DependencyFailed)
+    assert isinstance(results[2].error, DependencyFailed)
+    assert results[3].value == 'UPDATE_COMPLETE'
@@ -0,0 +1,49 @@
+from stax.diff import diff_templates, format_path
+
+
+def test_diff_templates_by_resource():
+    before = {
+        'Resources': {
+            'Topic': {
+                'Type': 'AWS::SNS::Topic',
+                'Properties': {
+                    'TopicName': 'old',
+                    'Tags': [{
+                        'Key': 'a',
+                        'Value': 1
+                    }]
+                }
+            },
+            'Queue': {
+                'Type': 'AWS::SQS::Queue'
+            },
+        }
+    }
+    # Reordered, with YAML's untyped scalars
+    after = {
+        'Resources': {
+            'Bucket': {
+                'Type': 'AWS::S3::Bucket'
+            },
+            'Topic': {
+                'Properties': {
+                    'Tags': [{
+                        'Value': '1',
+                        'Key': 'a'
+                    }],
+                    'TopicName': 'new',
+                },
+                'Type': 'AWS::SNS::Topic',
+            },
+        }
+    }
+
+    assert [(difference.kind, format_path(difference.path))
+            for difference in diff_templates(before, after)] == [
+                ('added', 'Resources.Bucket'),
+                ('removed', 'Resources.Queue'),
+                ('changed', 'Resources.Topic.Properties.TopicName'),
+            ]
+    assert diff_templates(before, before) == []
+    assert format_path(['Resources', 'Topic', 'Tags', 0,
+                        'Value']) == 'Resources.Topic.Tags[0].Value'
@@ -0,0 +1,60 @@
+import datetime
+
+import boto3
+from botocore.stub import Stubber
+
+from stax.aws.events import EventTail, format_event
+
+
+def event(number, status='UPDATE_IN_PROGRESS', reason=None):
+    event = {
+        'StackId': 'stack-id',
+        'StackName': 'app',
+        'EventId': f'event-{number}',
+        'LogicalResourceId': f'Resource{number}',
+        'ResourceType': 'AWS::SNS::Topic',
+        'ResourceStatus': status,
+        'Timestamp': datetime.datetime(2020, 1, 1, 0, 0, number),
+    }
+    if reason:
+        event['ResourceStatusReason'] = reason
+    return event
+
+
+def test_event_tail_only_fetches_new_events():
+    client = boto3.client('cloudformation',
+                          region_name='ap-southeast-2',
+                          aws_access_key_id='test',
+                          aws_secret_access_key='test')
+    stubber = Stubber(client)
+    # Priming only reads the first page of a long history
+    stubber.add_response('describe_stack_events', {
+        'StackEvents': [event(3), event(2)],
+        'NextToken': 'older'
+    }, {'StackName': 'app'})
+    stubber.add_response(
+        'describe_stack_events', {
+            'StackEvents': [
+                event(5, 'CREATE_FAILED', 'Access denied'),
+                event(4),
+                event(3),
+                event(2)
+            ],
+            'NextToken':
+            'older'
+        }, {'StackName': 'app'})
+    stubber.add_response('describe_stack_events', {
+        'StackEvents': [event(5)],
+        'NextToken': 'older'
+    }, {'StackName': 'app'})
+
+    with stubber:
+        tail = EventTail(client, 'app')
+        tail.prime()
+        new_events = tail.poll()
+        assert [e['EventId'] for e in new_events] == ['event-4', 'event-5']
+        assert tail.poll() == []
+        stubber.assert_no_pending_responses()
+
+    assert 'Resource5 (AWS::SNS::Topic) CREATE_FAILED: Access denied' in (
+        format_event(new_events[-1]))
@@ -0,0 +1,53 @@
+import os
+import stat
+
+import pytest
+
+from stax import files
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_atomic_write(tmp_path):
+    path = tmp_path / 'stax.json'
+    files.atomic_write(str(path), 'first')
+    assert path.read_text() == 'first'
+    assert mode(path) == 0o666 & ~files.read_umask()
+
+    # Replacing a file keeps its mode
+    path.chmod(0o600)
+    files.atomic_write(str(path), 'second')
+    assert path.read_text() == 'second'
+    assert mode(path) == 0o600
+    assert os.listdir(tmp_path) == ['stax.json']
+
+
+def test_failed_writes_are_cleaned_up(tmp_path):
+    path = tmp_path / 'stax.json'
+    path.write_text('first')
+    with pytest.raises(TypeError):
+        files.atomic_write(str(path), None)
+    assert path.read_text() == 'first'
+    assert os.listdir(tmp_path) == ['stax.json']
+
+
+def test_write_if_changed(tmp_path):
+    path = tmp_path / 'stax.json'
+    assert files.write_if_changed(str(path), 'content')
+    os.utime(path, ns=(0, 0))
+
+    assert not files.write_if_changed(str(path), 'content')
+    assert os.stat(path).st_mtime_ns == 0
+    assert files.write_if_changed(str(path), 'changed')
+    assert path.read_text() == 'changed'
+
+
+def test_read_umask_leaves_it_alone():
+    mask = os.umask(0o027)
+    try:
+        assert files.read_umask() == 0o027
+        assert os.umask(0o027) == 0o027
+    finally:
+        os.umask(mask)
@@ -0,0 +1,26 @@
+import os
+
+from stax import fingerprint
+
+
+def test_fingerprint_cache_only_rehashes_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(fingerprint, 'RACY_SECONDS', -1)
+    template = tmp_path / 'template.json'
+    template.write_text('{}')
+    cache = fingerprint.FingerprintCache(str(tmp_path / 'fingerprints.json'))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return f'hash-{len(calls)}'
+
+    assert cache.get(str(template), compute, extra='params') == 'hash-1'
+    cache.save()
+
+    reloaded = fingerprint.FingerprintCache(str(tmp_path /
+                                                'fingerprints.json'))
+    assert reloaded.get(str(template), compute, extra='params') == 'hash-1'
+    assert reloaded.get(str(template), compute, extra='other') == 'hash-2'
+
+    template.write_text('{"changed": true}')
+    assert reloaded.get(str(template), compute, extra='params') == 'hash-3'
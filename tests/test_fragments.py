@@ -0,0 +1,153 @@
+import json
+import os
+import time
+
+import pytest
+
+from stax import files, utils
+from stax.exceptions import ConfigError
+from stax.fragments import FragmentStacks
+from stax.registry import StackRegistry
+
+
+def backdate(*paths):
+    past = time.time() - 60
+    for path in paths:
+        os.utime(path, (past, past))
+
+
+def stack(*keys):
+    return {
+        'template': 'template.yaml',
+        'parameters': {key: ''
+                       for key in keys}
+    }
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('STAX_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'stax.d' / 'data').mkdir(parents=True)
+    (tmp_path / 'stax.d' / 'web.json').write_text(
+        json.dumps({'stacks': {
+            'web': stack('dev', 'us-east-1/prod')
+        }}))
+    (tmp_path / 'stax.d' / 'data' / 'db.json').write_text(
+        json.dumps({'stacks': {
+            'db': stack('prod')
+        }}))
+    backdate(tmp_path / 'stax.d' / 'web.json',
+             tmp_path / 'stax.d' / 'data' / 'db.json')
+    return tmp_path / 'stax.d'
+
+
+def test_only_targeted_fragments_are_parsed(config_dir):
+    config = {
+        'default_region': 'ap-southeast-2',
+        'stacks': FragmentStacks({'vpc': stack('prod')}, 'stax.d'),
+    }
+    assert sorted(config['stacks']) == ['db', 'vpc', 'web']
+
+    # The index is cached, so nothing is parsed until a stack is built
+    config['stacks'] = FragmentStacks({'vpc': stack('prod')}, 'stax.d')
+    assert config['stacks']._loaded == {}
+
+    registry = StackRegistry(config)
+    assert len(registry) == 4
+    assert [repr(stack) for stack in registry.search(account='prod')] == [
+        'prod/ap-southeast-2/vpc', 'prod/us-east-1/web',
+        'prod/ap-southeast-2/db'
+    ]
+    assert list(config['stacks']._loaded) == ['web.json', 'data/db.json']
+
+
+def test_changed_fragments_are_indexed_again(config_dir):
+    FragmentStacks({}, 'stax.d')
+    (config_dir / 'web.json').write_text(
+        json.dumps({'stacks': {
+            'web': stack('dev'),
+            'api': stack('dev')
+        }}))
+    stacks = FragmentStacks({}, 'stax.d')
+    assert sorted(stacks) == ['api', 'db', 'web']
+    assert list(stacks._loaded) == ['web.json']
+
+
+def test_recently_modified_fragments_are_parsed_again(config_dir):
+    (config_dir / 'web.json').write_text(
+        json.dumps({'stacks': {
+            'web': stack('dev')
+        }}))
+    FragmentStacks({}, 'stax.d')
+    # web.json could change again within the same mtime tick
+    assert list(FragmentStacks({}, 'stax.d')._loaded) == ['web.json']
+
+    backdate(config_dir / 'web.json')
+    FragmentStacks({}, 'stax.d')
+    assert FragmentStacks({}, 'stax.d')._loaded == {}
+
+
+def test_changed_stacks_only_parse_changed_fragments(config_dir, tmp_path,
+                                                     monkeypatch):
+    (config_dir / 'web.json').write_text(
+        json.dumps(
+            {'stacks': {
+                'web': stack('dev'),
+                'api': stack('dev', 'prod')
+            }}))
+    backdate(config_dir / 'web.json')
+    old_files = {
+        'stax.json':
+        '{}',
+        'stax.d/web.json':
+        json.dumps({'stacks': {
+            'web': stack('dev'),
+            'api': stack('dev')
+        }}),
+    }
+    monkeypatch.setattr(utils.gitlib, 'working_dir', lambda: str(tmp_path))
+    monkeypatch.setattr(utils.gitlib, 'changed_files',
+                        lambda revision: ['stax.d/web.json'])
+    monkeypatch.setattr(utils.gitlib, 'file_contents',
+                        lambda filename, revision: old_files.get(filename))
+    (tmp_path / 'stax.json').write_text('{}')
+
+    FragmentStacks({}, 'stax.d')
+    stacks = FragmentStacks({}, 'stax.d')
+    found = utils.changed_stacks({'stacks': stacks}, 'HEAD')
+    # Only the stack edited within the changed fragment has changed
+    assert found == {('api', 'dev'), ('api', 'prod')}
+    assert list(stacks._loaded) == ['web.json']
+
+
+def test_duplicate_names_are_rejected(config_dir):
+    with pytest.raises(ConfigError, match='db is defined in both'):
+        FragmentStacks({'db': stack('dev')}, 'stax.d')
+
+    (config_dir / 'copy.json').write_text(
+        json.dumps({'stacks': {
+            'web': stack('dev')
+        }}))
+    with pytest.raises(ConfigError, match='web is defined in both'):
+        FragmentStacks({}, 'stax.d')
+
+
+def test_config_writes_stacks_back_to_fragments(config_dir, tmp_path):
+    (tmp_path / 'stax.json').write_text(
+        json.dumps({'stacks': {
+            'vpc': stack('prod')
+        }}))
+
+    config = files.read_config()
+    config['stacks']['db']['parameters']['dev'] = ''
+    config['stacks']['new'] = stack('dev')
+    files.write_config(config)
+
+    assert sorted(json.loads(
+        (tmp_path / 'stax.json').read_text())['stacks']) == ['new', 'vpc']
+    assert json.loads((config_dir / 'data' / 'db.json').read_text()) == {
+        'stacks': {
+            'db': stack('prod', 'dev')
+        }
+    }
@@ -0,0 +1,53 @@
+import threading
+import time
+
+from stax.parallel import in_worker, run_parallel
+
+
+def test_run_parallel_keeps_order_and_collects_errors():
+    def func(item):
+        if item == 3:
+            raise ValueError('boom')
+        return item * 2
+
+    results = run_parallel(range(6), func, concurrency=3)
+    assert [result.item for result in results] == list(range(6))
+    assert [result.value for result in results] == [0, 2, 4, None, 8, 10]
+    assert isinstance(results[3].error, ValueError)
+
+
+def test_run_parallel_respects_limits():
+    lock = threading.Lock()
+    running = {'a': 0, 'b': 0}
+    peak = {'a': 0, 'b': 0}
+
+    def func(item):
+        with lock:
+            running[item] += 1
+            peak[item] = max(peak[item], running[item])
+        time.sleep(0.01)
+        with lock:
+            running[item] -= 1
+
+    run_parallel(['a', 'b'] * 5,
+                 func,
+                 concurrency=4,
+                 limits=[(lambda item: item, 1)])
+    assert peak == {'a': 1, 'b': 1}
+
+
+def test_nested_calls_run_inline():
+    threads = set()
+
+    def inner(item):
+        threads.add(threading.current_thread())
+        return item
+
+    def outer(item):
+        results = run_parallel(range(4), inner, concurrency=4)
+        assert [result.value for result in results] == list(range(4))
+        assert in_worker()
+        return threading.current_thread()
+
+    results = run_parallel(range(2), outer, concurrency=2)
+    assert threads <= {result.value for result in results}
@@ -0,0 +1,133 @@
+import collections
+import datetime
+import io
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from stax import plan
+from stax.aws import cloudformation
+from stax.exceptions import PlanError
+
+FakeStack = collections.namedtuple('FakeStack', [
+    'purge', 'hash_of_params_and_template', 'remote_stax_hash', 'client',
+    'remote'
+])
+
+
+def entry(**kwargs):
+    return dict(
+        {
+            'account': 'dev',
+            'region': 'ap-southeast-2',
+            'name': 'app',
+            'action': 'UPDATE',
+            'changeset_id': 'arn:changeset',
+            'stax_hash': 'local',
+            'remote_stax_hash': 'remote',
+            'changes': [],
+        }, **kwargs)
+
+
+def test_plan_files_round_trip():
+    fh = io.StringIO()
+    plan.write_plan(fh, [entry()])
+    fh.seek(0)
+    assert plan.read_plan(fh) == [entry()]
+
+    old = io.StringIO('{"stacks": []}')
+    old.name = 'old.json'
+    with pytest.raises(PlanError):
+        plan.read_plan(old)
+
+
+def test_verify_entry():
+    client = boto3.client('cloudformation',
+                          region_name='ap-southeast-2',
+                          aws_access_key_id='test',
+                          aws_secret_access_key='test')
+    stubber = Stubber(client)
+    for status in ('AVAILABLE', 'OBSOLETE'):
+        stubber.add_response(
+            'describe_change_set', {
+                'ChangeSetId': 'arn:changeset',
+                'StackName': 'app',
+                'ExecutionStatus': status,
+            })
+    stack = FakeStack(False, 'local', 'remote', client,
+                      {'StackStatus': 'UPDATE_COMPLETE'})
+
+    with stubber:
+        plan.verify_entry(stack, entry())
+        with pytest.raises(PlanError, match='OBSOLETE'):
+            plan.verify_entry(stack, entry())
+
+    with pytest.raises(PlanError, match='template or parameters'):
+        plan.verify_entry(stack, entry(stax_hash='edited'))
+    with pytest.raises(PlanError, match='live stack'):
+        plan.verify_entry(stack, entry(remote_stax_hash='pushed'))
+    with pytest.raises(PlanError, match='purge'):
+        plan.verify_entry(stack, entry(action='DELETE'))
+
+
+def test_apply_planned_create(monkeypatch):
+    client = boto3.client('cloudformation',
+                          region_name='ap-southeast-2',
+                          aws_access_key_id='test',
+                          aws_secret_access_key='test')
+    monkeypatch.setattr(cloudformation, '_SNAPSHOTS', {})
+    monkeypatch.setattr(cloudformation.Cloudformation, 'client',
+                        property(lambda self: client))
+    stack = cloudformation.Stack('app',
+                                 'dev',
+                                 'ap-southeast-2',
+                                 template_body='{"Resources": {}}')
+
+    def description(status):
+        # Creating the changeset tagged the stack to review with the new hash
+        return {
+            'StackName':
+            'app',
+            'StackId':
+            'arn:stack',
+            'StackStatus':
+            status,
+            'CreationTime':
+            datetime.datetime(2020, 1, 1),
+            'Tags': [{
+                'Key': 'STAX_HASH',
+                'Value': stack.hash_of_params_and_template
+            }],
+        }
+
+    stubber = Stubber(client)
+    stubber.add_response('describe_stacks',
+                         {'Stacks': [description('REVIEW_IN_PROGRESS')]})
+    stubber.add_response(
+        'describe_change_set', {
+            'ChangeSetId': 'arn:changeset',
+            'StackName': 'app',
+            'ExecutionStatus': 'AVAILABLE',
+        })
+    stubber.add_response('describe_stack_events', {'StackEvents': []})
+    stubber.add_response('execute_change_set', {},
+                         {'ChangeSetName': 'arn:changeset'})
+    stubber.add_response('describe_stacks',
+                         {'Stacks': [description('CREATE_COMPLETE')]})
+    stubber.add_response('describe_stack_events', {'StackEvents': []})
+
+    planned = entry(action='CREATE',
+                    stax_hash=stack.hash_of_params_and_template,
+                    remote_stax_hash=None)
+    with stubber:
+        plan.verify_entry(stack, planned)
+        assert plan.apply_entry(stack, planned) == 'CREATE_COMPLETE'
+        stubber.assert_no_pending_responses()
+
+    # Anything else creating the stack since planning is caught
+    cloudformation._SNAPSHOTS[('dev', 'ap-southeast-2')] = {
+        'app': description('CREATE_COMPLETE')
+    }
+    with pytest.raises(PlanError, match='live stack'):
+        plan.verify_entry(stack, planned)
@@ -0,0 +1,83 @@
+import collections
+
+import boto3
+from botocore.stub import Stubber
+
+from stax.aws import poller
+
+FakeStack = collections.namedtuple('FakeStack',
+                                   ['name', 'account', 'region', 'client'])
+
+
+def describe(name, status):
+    return {
+        'StackName': name,
+        'StackStatus': status,
+        'CreationTime': '2020-01-01',
+    }
+
+
+def test_poller_describes_due_stacks_together(monkeypatch):
+    monkeypatch.setattr(poller, 'MIN_INTERVAL', 0)
+    client = boto3.client('cloudformation',
+                          region_name='ap-southeast-2',
+                          aws_access_key_id='test',
+                          aws_secret_access_key='test')
+    stubber = Stubber(client)
+    stubber.add_response(
+        'describe_stacks', {
+            'Stacks': [
+                describe('one', 'UPDATE_IN_PROGRESS'),
+                describe('two', 'UPDATE_COMPLETE'),
+            ]
+        })
+    stubber.add_response(
+        'describe_stacks',
+        {'Stacks': [describe('one', 'UPDATE_ROLLBACK_COMPLETE')]},
+        {'StackName': 'one'})
+
+    updates = []
+    with stubber:
+        watcher = poller.Poller()
+        # Register both stacks before the poller thread gets a look in
+        with watcher._condition:
+            futures = [
+                watcher.watch_stack(
+                    FakeStack(name, 'dev', 'ap-southeast-2', client),
+                    until=['UPDATE_COMPLETE', 'UPDATE_ROLLBACK_COMPLETE'],
+                    on_update=updates.append) for name in ['one', 'two']
+            ]
+        results = [future.result(timeout=5) for future in futures]
+
+    assert [result['StackStatus'] for result in results
+            ] == ['UPDATE_ROLLBACK_COMPLETE', 'UPDATE_COMPLETE']
+    assert updates == [
+        'UPDATE_IN_PROGRESS', 'UPDATE_COMPLETE', 'UPDATE_ROLLBACK_COMPLETE'
+    ]
+    stubber.assert_no_pending_responses()
+
+
+def test_poller_waits_for_drift_detection(monkeypatch):
+    monkeypatch.setattr(poller, 'MIN_INTERVAL', 0)
+    client = boto3.client('cloudformation',
+                          region_name='ap-southeast-2',
+                          aws_access_key_id='test',
+                          aws_secret_access_key='test')
+    stubber = Stubber(client)
+    for status in ['DETECTION_IN_PROGRESS', 'DETECTION_COMPLETE']:
+        stubber.add_response(
+            'describe_stack_drift_detection_status', {
+                'StackId': 'stack-id',
+                'StackDriftDetectionId': 'detection-id',
+                'StackDriftStatus': 'DRIFTED',
+                'DetectionStatus': status,
+                'Timestamp': '2020-01-01',
+            }, {'StackDriftDetectionId': 'detection-id'})
+
+    with stubber:
+        result = poller.Poller().watch_drift(
+            FakeStack('one', 'dev', 'ap-southeast-2', client),
+            'detection-id').result(timeout=5)
+
+    assert result['StackDriftStatus'] == 'DRIFTED'
+    stubber.assert_no_pending_responses()
@@ -0,0 +1,65 @@
+import boto3
+from botocore.stub import Stubber
+
+from stax import profiling
+
+
+def enable(monkeypatch):
+    monkeypatch.setattr(profiling, 'ENABLED', True)
+    monkeypatch.setattr(profiling, '_SPANS', [])
+
+
+def test_span_records_nothing_when_disabled(monkeypatch):
+    monkeypatch.setattr(profiling, '_SPANS', [])
+    with profiling.span('set_stacks'):
+        pass
+    assert profiling.span('plan') is profiling._DISABLED
+    assert profiling._SPANS == []
+
+
+def test_summary_groups_api_calls(monkeypatch):
+    enable(monkeypatch)
+    client = boto3.client('cloudformation',
+                          region_name='ap-southeast-2',
+                          aws_access_key_id='test',
+                          aws_secret_access_key='test')
+    profiling.install(client, 'dev', 'ap-southeast-2', 'cloudformation')
+    stubber = Stubber(client)
+    stubber.add_response('describe_stacks', {'Stacks': []})
+    stubber.add_response('describe_stacks', {'Stacks': []})
+
+    with stubber, profiling.span('plan'):
+        client.describe_stacks()
+        client.describe_stacks()
+    profiling.sleep(0.001, 'rate limit', 'cloudformation', 'dev',
+                    'ap-southeast-2')
+
+    rows = {(category, name): count
+            for category, name, count, total in profiling.summary()}
+    assert rows == {
+        ('api', 'cloudformation.DescribeStacks dev/ap-southeast-2'): 2,
+        ('throttle', 'cloudformation.rate limit dev/ap-southeast-2'): 1,
+        ('stax', 'plan'): 1,
+    }
+
+    events = profiling.trace_events()['traceEvents']
+    assert {event['ph'] for event in events} == {'X'}
+    assert [
+        event['args'].get('status') for event in events
+        if event['cat'] == 'api'
+    ] == [200, 200]
+
+
+def test_timed_records_the_target(monkeypatch):
+    enable(monkeypatch)
+
+    class Stack:
+        @profiling.timed('wait', method=True)
+        def wait(self):
+            return 'done'
+
+        def __repr__(self):
+            return 'dev/ap-southeast-2/stack'
+
+    assert Stack().wait() == 'done'
+    assert profiling._SPANS[0].args == {'target': 'dev/ap-southeast-2/stack'}
@@ -0,0 +1,80 @@
+import json
+
+from click.testing import CliRunner
+
+from stax import utils
+from stax.commands import cmd_push
+from stax.stax import cli
+
+
+def write_config(path, *names):
+    path.write_text(
+        json.dumps({
+            'accounts': {
+                'dev': {
+                    'id': '1',
+                    'profile': 'dev'
+                }
+            },
+            'default_region': 'ap-southeast-2',
+            'stacks': {
+                name: {
+                    'template': f'{name}.json',
+                    'parameters': {
+                        'dev': ''
+                    }
+                }
+                for name in names
+            },
+        }))
+
+
+def test_push_with_nothing_changed_succeeds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_config(tmp_path / 'stax.json', 'app')
+    monkeypatch.setattr(utils, 'changed_stacks',
+                        lambda config, revision: set())
+
+    result = CliRunner().invoke(cli, ['push', '--changed-since', 'HEAD'])
+    assert result.exit_code == 0
+    assert 'No stacks changed since HEAD' in result.output
+
+    result = CliRunner().invoke(cli, ['push', 'missing'])
+    assert result.exit_code == 1
+    assert 'No stacks found to update' in result.output
+
+
+def test_push_in_order_reports_critical_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('STAX_CACHE_DIR', str(tmp_path / 'cache'))
+    write_config(tmp_path / 'stax.json', 'app', 'vpc')
+    (tmp_path / 'vpc.json').write_text(
+        json.dumps({
+            'Outputs': {
+                'Vpc': {
+                    'Value': 'vpc-1',
+                    'Export': {
+                        'Name': 'vpc'
+                    }
+                }
+            }
+        }))
+    (tmp_path / 'app.json').write_text(
+        json.dumps({'Resources': {
+            'Vpc': {
+                'Fn::ImportValue': 'vpc'
+            }
+        }}))
+    pushed = []
+    monkeypatch.setattr(
+        cmd_push, 'pending_stacks',
+        lambda ctx, found_stacks, compare_hashes, concurrency: found_stacks)
+    monkeypatch.setattr(
+        cmd_push, 'push_stack',
+        lambda stack, *args: pushed.append(stack.name) or 'UPDATE_COMPLETE')
+
+    result = CliRunner().invoke(cli, ['push', 'app', 'vpc'])
+    assert result.exit_code == 0, result.output
+    assert pushed == ['vpc', 'app']
+    assert 'Critical path' in result.output
+    assert 'dev/ap-southeast-2/vpc -> dev/ap-southeast-2/app' in result.output
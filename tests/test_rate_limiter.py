@@ -0,0 +1,64 @@
+import botocore.exceptions
+
+from stax.aws import connection_manager, rate_limiter
+
+
+class FakeHTTPResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def test_token_bucket_throttles_and_recovers():
+    bucket = rate_limiter.TokenBucket(rate=4, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0 < bucket.reserve() <= 0.25
+
+    bucket.throttled()
+    assert bucket.rate == 2
+    for _ in range(100):
+        bucket.succeeded()
+    assert bucket.rate == 4
+
+
+def test_retry_reason():
+    assert rate_limiter.retry_reason((FakeHTTPResponse(400), {
+        'Error': {
+            'Code': 'Throttling'
+        }
+    }), None) == 'Throttling'
+    assert rate_limiter.retry_reason((FakeHTTPResponse(400), {
+        'Error': {
+            'Code': 'ValidationError'
+        }
+    }), None) is None
+    assert rate_limiter.retry_reason((FakeHTTPResponse(503), {}),
+                                     None) == 'HTTP503'
+    assert rate_limiter.retry_reason(
+        None,
+        botocore.exceptions.EndpointConnectionError(
+            endpoint_url='https://example.com')) == 'EndpointConnectionError'
+
+
+def test_only_the_rate_limiter_retries(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    monkeypatch.setattr(connection_manager, '_CLIENTS', {})
+    monkeypatch.setattr(connection_manager, '_SESSIONS', {})
+    client = connection_manager.get_client(None, 'ap-southeast-2',
+                                           'cloudformation')
+
+    responses = client.meta.events.emit(
+        'needs-retry.cloudformation.DescribeStacks',
+        response=(FakeHTTPResponse(400), {
+            'Error': {
+                'Code': 'Throttling'
+            }
+        }),
+        endpoint=None,
+        operation=client.meta.service_model.operation_model('DescribeStacks'),
+        attempts=1,
+        caught_exception=None,
+        request_dict={'context': {}})
+    delays = [delay for _, delay in responses if delay is not None]
+    assert len(delays) == 1
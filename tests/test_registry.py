@@ -0,0 +1,85 @@
+from stax.aws import template_cache
+from stax.registry import StackRegistry
+
+CONFIG = {
+    'default_region': 'ap-southeast-2',
+    'stacks': {
+        'app-api': {
+            'template': 'templates/app.yaml',
+            'parameters': {
+                'dev': '',
+                'us-east-1/prod': 'params/${account}.json',
+            },
+        },
+        'app-web': {
+            'template': 'templates/app.yaml',
+            'parameters': {
+                'prod': '',
+            },
+        },
+        'db': {
+            'template': 'templates/db.yaml',
+            'parameters': {
+                'prod': '',
+            },
+        },
+    },
+}
+
+
+def test_registry_search():
+    registry = StackRegistry(CONFIG)
+    assert len(registry) == 4
+
+    def search(**filters):
+        return [repr(stack) for stack in registry.search(**filters)]
+
+    assert search(account=['prod']) == [
+        'prod/us-east-1/app-api', 'prod/ap-southeast-2/app-web',
+        'prod/ap-southeast-2/db'
+    ]
+    assert search(account=['prod'], name=['app-*']) == [
+        'prod/us-east-1/app-api', 'prod/ap-southeast-2/app-web'
+    ]
+    assert search(region='us-east-1',
+                  name=('db', 'app-api')) == ['prod/us-east-1/app-api']
+    assert search(name=['missing*']) == []
+
+    # Stacks are only built once they are found
+    assert len(registry._stacks) == 3
+
+
+def test_registry_only_indexes_given_stacks():
+    registry = StackRegistry(CONFIG, only={('db', 'prod')})
+    assert [stack.name for stack in registry] == ['db']
+
+
+def test_stacks_share_templates(tmp_path):
+    template = tmp_path / 'template.json'
+    template.write_text('{"Resources": {}}')
+    config = {
+        'default_region': 'ap-southeast-2',
+        'stacks': {
+            name: {
+                'template': str(template),
+                'parameters': {
+                    'dev': ''
+                }
+            }
+            for name in ('one', 'two')
+        },
+    }
+    one, two = StackRegistry(config)
+    assert one.template is two.template
+    assert not hasattr(one, '__dict__')
+
+    raw = one.template.raw
+    assert one.template.to_dict == {'Resources': {}}
+    # The template is kept until every stack using it releases it
+    one.template.release()
+    assert two.template.body == raw
+    two.template.release()
+    assert one.template.body is None
+    assert one.template.parsed is None
+    assert template_cache.template_key(raw) not in template_cache._PARSED
+    assert two.template.raw == raw
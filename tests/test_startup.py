@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+CHECK_IMPORTS = '''
+import sys
+from stax.stax import cli
+for command in cli.list_commands(None):
+    cli.get_command(None, command)
+print(','.join(module for module in ['boto3', 'git', 'halo', 'yaml']
+               if module in sys.modules))
+'''
+
+
+def test_commands_load_without_heavy_imports():
+    proc = subprocess.run([sys.executable, '-c', CHECK_IMPORTS],
+                          capture_output=True,
+                          text=True,
+                          check=True)
+    assert proc.stdout.strip() == ''
@@ -0,0 +1,109 @@
+import json
+
+from stax.aws import template_cache
+from stax.diff import diff_templates
+
+YAML_TEMPLATE = '''
+Resources:
+  Topic:
+    Type: AWS::SNS::Topic
+'''
+
+
+def test_parse_shares_identical_templates():
+    extn, first = template_cache.parse('{"Resources": {}}')
+    assert extn == 'json'
+    assert template_cache.parse('{"Resources": {}}')[1] is first
+
+
+def test_parse_uses_disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('STAX_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('STAX_TEMPLATE_CACHE_MB', '1')
+    monkeypatch.setattr(template_cache, '_PARSED', {})
+
+    assert template_cache.parse(YAML_TEMPLATE) == ('yaml', {
+        'Resources': {
+            'Topic': {
+                'Type': 'AWS::SNS::Topic'
+            }
+        }
+    })
+    assert len(list(tmp_path.glob('templates/*/*.json'))) == 1
+
+    monkeypatch.setattr(template_cache, '_PARSED', {})
+    monkeypatch.setattr(template_cache, 'parse_raw', None)
+    assert template_cache.parse(YAML_TEMPLATE)[0] == 'yaml'
+
+
+def test_yaml_keeps_intrinsic_functions():
+    extn, parsed = template_cache.parse_raw('''
+AWSTemplateFormatVersion: 2010-09-09
+Resources:
+  Queue:
+    Type: AWS::SQS::Queue
+    Properties:
+      QueueName: !Sub '${AWS::StackName}-queue'
+      DelaySeconds: 5
+      Topic: !GetAtt Topic.Arn
+      Vpc: !ImportValue
+        Fn::Sub: '${Env}-vpc'
+      Zone: !Select [0, !GetAZs '']
+Conditions:
+  Prod: !Equals [!Ref Env, prod]
+''')
+    assert extn == 'yaml'
+    assert parsed['AWSTemplateFormatVersion'] == '2010-09-09'
+    assert parsed['Resources']['Queue']['Properties'] == {
+        'QueueName': {
+            'Fn::Sub': '${AWS::StackName}-queue'
+        },
+        'DelaySeconds': '5',
+        'Topic': {
+            'Fn::GetAtt': ['Topic', 'Arn']
+        },
+        'Vpc': {
+            'Fn::ImportValue': {
+                'Fn::Sub': '${Env}-vpc'
+            }
+        },
+        'Zone': {
+            'Fn::Select': ['0', {
+                'Fn::GetAZs': ''
+            }]
+        },
+    }
+    assert parsed['Conditions'] == {
+        'Prod': {
+            'Fn::Equals': [{
+                'Ref': 'Env'
+            }, 'prod']
+        }
+    }
+
+
+def test_yaml_scalars_stay_strings():
+    extn, parsed = template_cache.parse_raw('''
+Mappings:
+  Accounts:
+    200:
+      Id: 012345670123
+      Enabled: yes
+      Version: 1.10
+    dev:
+      Id: '123456789012'
+      Enabled: off
+''')
+    assert parsed['Mappings']['Accounts'] == {
+        '200': {
+            'Id': '012345670123',
+            'Enabled': 'yes',
+            'Version': '1.10'
+        },
+        'dev': {
+            'Id': '123456789012',
+            'Enabled': 'off'
+        },
+    }
+    assert diff_templates(parsed,
+                          {}) == diff_templates(json.loads(json.dumps(parsed)),
+                                                {})
@@ -0,0 +1,65 @@
+import json
+
+import boto3
+from botocore.stub import Stubber
+
+from stax.aws import uploads
+from stax.aws.cloudformation import Stack
+from stax.parallel import run_parallel
+
+
+def test_shared_templates_upload_once(tmp_path, monkeypatch):
+    monkeypatch.setenv('STAX_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(uploads, '_FUTURES', {})
+    monkeypatch.setattr(uploads, '_MANIFEST', None)
+    client = boto3.client('s3',
+                          region_name='ap-southeast-2',
+                          aws_access_key_id='test',
+                          aws_secret_access_key='test')
+    key = uploads.template_key('abc')
+    stubber = Stubber(client)
+    stubber.add_client_error('head_object',
+                             service_error_code='404',
+                             http_status_code=404,
+                             expected_params={
+                                 'Bucket': 'bucket',
+                                 'Key': key
+                             })
+    stubber.add_response('put_object', {}, {
+        'Body': 'body',
+        'Bucket': 'bucket',
+        'Key': key
+    })
+
+    with stubber:
+        results = run_parallel(
+            range(50),
+            lambda _: uploads.upload(client, 'bucket', key, 'body'),
+            concurrency=8)
+        stubber.assert_no_pending_responses()
+    assert [result.value for result in results].count(True) == 1
+
+    # A later run trusts the manifest rather than checking the bucket
+    monkeypatch.setattr(uploads, '_FUTURES', {})
+    monkeypatch.setattr(uploads, '_MANIFEST', None)
+    with Stubber(client):
+        assert uploads.upload(client, 'bucket', key, 'body') is False
+
+
+def test_unwritable_manifest_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setenv('STAX_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(uploads, '_MANIFEST', {})
+
+    def atomic_write(path, content):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(uploads.files, 'atomic_write', atomic_write)
+    uploads.remember('bucket', 'key')
+    assert uploads.in_manifest('bucket', 'key')
+
+
+def test_template_size_is_measured_in_bytes():
+    body = json.dumps({'Description': '€' * 20000}, ensure_ascii=False)
+    assert len(body) <= uploads.MAX_TEMPLATE_BODY
+    stack = Stack('app', 'dev', 'ap-southeast-2', template_body=body)
+    assert stack.needs_upload